@@ -5,22 +5,27 @@ from hwdb.config import get_openvpn_server
 from hwdb.config import get_wireguard_network
 from hwdb.config import get_wireguard_server
 from hwdb.enumerations import ApplicationMode
+from hwdb.enumerations import CircuitState
 from hwdb.enumerations import Connection
 from hwdb.enumerations import DeploymentType
 from hwdb.enumerations import HardwareType
 from hwdb.enumerations import HardwareModel
 from hwdb.enumerations import OperatingSystem
+from hwdb.enumerations import PushStatus
 from hwdb.exceptions import TerminalError
 from hwdb.exceptions import TerminalConfigError
 from hwdb.exceptions import AmbiguityError
 from hwdb.exceptions import SystemOffline
+from hwdb.fanout import fanout
 from hwdb.filter import get_deployments, get_systems
+from hwdb.filter import select_systems, stream_deployments, stream_systems
 from hwdb.orm import Deployment
 from hwdb.orm import DeploymentTemp
 from hwdb.orm import Display
 from hwdb.orm import GenericHardware
 from hwdb.orm import Group
 from hwdb.orm import OpenVPN
+from hwdb.orm import Reachability
 from hwdb.orm import SmartTV
 from hwdb.orm import System
 from hwdb.orm import get_free_ipv6_address
@@ -33,6 +38,7 @@ from hwdb.parsers import hook
 from hwdb.parsers import operating_system
 from hwdb.parsers import system
 from hwdb.parsers import systems
+from hwdb.sessions import close_sessions
 
 
 __all__ = [
@@ -41,6 +47,7 @@ __all__ = [
     "TerminalConfigError",
     "TerminalError",
     "ApplicationMode",
+    "CircuitState",
     "Connection",
     "Deployment",
     "DeploymentTemp",
@@ -51,14 +58,18 @@ __all__ = [
     "HardwareModel",
     "HardwareType",
     "OperatingSystem",
+    "PushStatus",
     "OpenVPN",
+    "Reachability",
     "SmartTV",
     "System",
+    "close_sessions",
     "connection",
     "customer",
     "date",
     "deployment",
     "deployment_type",
+    "fanout",
     "get_deployments",
     "get_free_ipv6_address",
     "get_systems",
@@ -66,6 +77,9 @@ __all__ = [
     "get_openvpn_network",
     "get_openvpn_server",
     "operating_system",
+    "select_systems",
+    "stream_deployments",
+    "stream_systems",
     "system",
     "systems",
     "get_wireguard_network",
@@ -2,61 +2,189 @@
 
 from collections import defaultdict
 from configparser import ConfigParser
+from math import ceil
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
 
 from hwdb.enumerations import OperatingSystem, DeploymentType
 
 
-__all__ = ["AnsibleMixin"]
+__all__ = ["AnsibleMixin", "RolloutHost", "rollout_blocks"]
 
 
 BLOCK_SIZE = 50
+INVENTORY_RELATIONS = frozenset({"deployment", "openvpn"})
 LINUX = {OperatingSystem.ARCH_LINUX, OperatingSystem.ARCH_LINUX_ARM}
+OFFLINE_WEIGHT = 10.0  # Offline hosts cost about a connection timeout.
+RTT_FACTOR = 100  # Approximate amount of round trips of a play.
+UNKNOWN_WEIGHT = 1.0
+
+
+class RolloutHost(NamedTuple):
+    """A host to be assigned to a rollout block."""
+
+    host: Any
+    customer: Optional[int]
+    path: str  # VPN the host is reached through.
+    weight: float  # Expected cost of the host.
+
+
+def get_weight(reachability: Optional[tuple[bool, Optional[float]]]) -> float:
+    """Returns the expected cost of a host from its
+    recorded online state and round trip time.
+    """
+
+    if reachability is None:
+        return UNKNOWN_WEIGHT
+
+    online, rtt = reachability
+
+    if not online:
+        return OFFLINE_WEIGHT
+
+    return UNKNOWN_WEIGHT + (rtt or 0) * RTT_FACTOR
+
+
+def rollout_blocks(
+    hosts: Iterable[RolloutHost],
+    *,
+    block_size: int = BLOCK_SIZE,
+    path_limit: Optional[int] = None,
+) -> list[list[Any]]:
+    """Partitions the hosts into balanced rollout blocks.
+
+    The amount of blocks is the least one that satisfies the block size
+    and the limit of hosts per VPN path within a block. The hosts are
+    assigned greedily by descending weight to the block with the fewest
+    hosts of the same customer and, secondly, the least total weight.
+    """
+
+    hosts = sorted(hosts, key=lambda host: -host.weight)
+    paths = defaultdict(int)
+
+    for host in hosts:
+        paths[host.path] += 1
+
+    amount = ceil(len(hosts) / block_size)
+
+    if path_limit is not None:
+        amount = max([amount, *(ceil(count / path_limit) for count in paths.values())])
+
+    blocks = [[] for _ in range(amount)]
+    loads = [0.0] * amount
+    customers = [defaultdict(int) for _ in range(amount)]
+    path_counts = [defaultdict(int) for _ in range(amount)]
+
+    for host in hosts:
+        candidates = [
+            index
+            for index, block in enumerate(blocks)
+            if len(block) < block_size
+            and (path_limit is None or path_counts[index][host.path] < path_limit)
+        ]
+
+        if not candidates:
+            blocks.append([])
+            loads.append(0.0)
+            customers.append(defaultdict(int))
+            path_counts.append(defaultdict(int))
+            candidates = [len(blocks) - 1]
+
+        index = min(
+            candidates,
+            key=lambda index: (customers[index][host.customer], loads[index], index),
+        )
+        blocks[index].append(host.host)
+        loads[index] += host.weight
+        customers[index][host.customer] += 1
+        path_counts[index][host.path] += 1
+
+    return blocks
 
 
 class AnsibleMixin:
     """Mixin for providing methods for ansible configuration."""
 
     @classmethod
-    def ansible_groups(cls, *, block_size: int = BLOCK_SIZE) -> dict:
-        """Returns ansible groups."""
+    def ansible_groups(
+        cls,
+        *,
+        block_size: int = BLOCK_SIZE,
+        path_limit: Optional[int] = None,
+        reachability: Optional[dict[int, tuple[bool, Optional[float]]]] = None,
+    ) -> dict:
+        """Returns ansible groups.
+        The DDB systems are partitioned into balanced rollout blocks
+        weighted by the given reachability by system ID.
+        """
         groups = defaultdict(list)
-        ddb_block = 0
+        ddb = []
 
-        for index, system in enumerate(cls.select(cascade=True), start=1):
-            groups["systems"].append(system)
+        for system in cls.select(cascade=True):
+            for group in system.ansible_group_names():
+                groups[group].append(system)
 
-            if system.operating_system in LINUX:
-                groups["linux"].append(system)
-            else:  # Probably a Windows system.
-                groups["windows"].append(system)
+            if block_size is not None and system.is_ddb:
+                ddb.append(system.rollout_host(system, reachability))
 
-            if not (deployment := system.deployment):
-                continue
+        for index, block in enumerate(
+            rollout_blocks(ddb, block_size=block_size or 1, path_limit=path_limit)
+        ):
+            groups[f"ddb_block_{index}"] = block
 
-            groups[f"c{deployment.customer.id}"].append(system)
+        return groups
 
-            if deployment.type == DeploymentType.DDB:
-                groups["DDB"].append(system)
+    @classmethod
+    def ansible_inventory(
+        cls,
+        *,
+        block_size: int = BLOCK_SIZE,
+        path_limit: Optional[int] = None,
+        reachability: Optional[dict[int, tuple[bool, Optional[float]]]] = None,
+    ) -> dict:
+        """Returns the inventory in the format of ansible-inventory --list.
+        The host variables are computed from the same query as the groups.
+        """
+        groups = defaultdict(list)
+        hostvars = {}
+        ddb = []
 
-                if block_size is not None:
-                    if index % block_size == 0:
-                        ddb_block += 1
+        for system in (
+            cls.select(cascade=True, relations=INVENTORY_RELATIONS)
+            .where(True)
+            .iterator()
+        ):
+            hostvars[system.fqdn] = system.ansible_hostvars
 
-                    groups[f"ddb_block_{ddb_block}"].append(system)
-            else:  # Probably an E-TV or E-TV touch.
-                groups["ETV"].append(system)
+            for group in system.ansible_group_names():
+                groups[group].append(system.fqdn)
 
-        return groups
+            if block_size is not None and system.is_ddb:
+                ddb.append(system.rollout_host(system.fqdn, reachability))
+
+        for index, block in enumerate(
+            rollout_blocks(ddb, block_size=block_size or 1, path_limit=path_limit)
+        ):
+            groups[f"ddb_block_{index}"] = block
+
+        return {
+            "_meta": {"hostvars": hostvars},
+            "all": {"children": sorted(groups)},
+            **{group: {"hosts": hosts} for group, hosts in groups.items()},
+        }
 
     @classmethod
     def ansible_hosts(
-        cls, *, block_size: int = BLOCK_SIZE, config_parser: ConfigParser = None
+        cls,
+        *,
+        block_size: int = BLOCK_SIZE,
+        config_parser: ConfigParser = None,
+        **kwargs,
     ) -> ConfigParser:
         """Returns a config parser for ansible hosts."""
         if not config_parser:
             config_parser = ConfigParser(allow_no_value=True)
 
-        groups = cls.ansible_groups(block_size=block_size)
+        groups = cls.ansible_groups(block_size=block_size, **kwargs)
 
         for group, systems in groups.items():
             config_parser.add_section(group)
@@ -65,3 +193,65 @@ class AnsibleMixin:
                 config_parser.set(group, system.fqdn)
 
         return config_parser
+
+    @property
+    def is_ddb(self) -> bool:
+        """Checks whether the system is deployed as a DDB."""
+        return (
+            deployment := self.deployment
+        ) is not None and deployment.type == DeploymentType.DDB
+
+    @property
+    def ansible_hostvars(self) -> dict:
+        """Returns the host variables for ansible."""
+        deployment = self.deployment
+        openvpn = self.openvpn
+        ipv4address = None if openvpn is None else str(openvpn.ipv4address)
+        ipv6address = None if self.ipv6address is None else str(self.ipv6address)
+        return {
+            "ansible_host": ipv4address if self.pubkey is None else ipv6address,
+            "system_id": self.id,
+            "operating_system": self.operating_system.value,
+            "ipv4address": ipv4address,
+            "ipv6address": ipv6address,
+            "deployment": None if deployment is None else deployment.id,
+            "deployment_type": None if deployment is None else deployment.type.value,
+            "customer": None if deployment is None else deployment.customer_id,
+            "fitted": self.fitted,
+            "testing": self.testing,
+            "updating": self.updating,
+        }
+
+    def rollout_host(
+        self,
+        host: Any,
+        reachability: Optional[dict[int, tuple[bool, Optional[float]]]] = None,
+    ) -> RolloutHost:
+        """Returns the system as the given host for rollout_blocks()."""
+        return RolloutHost(
+            host,
+            self.deployment.customer_id,
+            "openvpn" if self.pubkey is None else "wireguard",
+            get_weight((reachability or {}).get(self.id)),
+        )
+
+    def ansible_group_names(self) -> Iterator[str]:
+        """Yields the names of the ansible groups
+        of the system except for the DDB blocks.
+        """
+        yield "systems"
+
+        if self.operating_system in LINUX:
+            yield "linux"
+        else:  # Probably a Windows system.
+            yield "windows"
+
+        if not (deployment := self.deployment):
+            return
+
+        yield f"c{deployment.customer_id}"
+
+        if deployment.type == DeploymentType.DDB:
+            yield "DDB"
+        else:  # Probably an E-TV or E-TV touch.
+            yield "ETV"
@@ -0,0 +1,200 @@
+"""Circuit breaker for remote control of systems."""
+
+from contextlib import contextmanager
+from functools import cache
+from threading import Lock
+from time import monotonic
+from typing import Iterator, Optional
+
+from requests import Timeout
+from requests.exceptions import ChunkedEncodingError, ConnectionError
+
+from hwdb.config import get_config
+from hwdb.enumerations import CircuitState
+from hwdb.exceptions import SystemOffline
+
+
+__all__ = ["Call", "Circuit", "CircuitBreaker", "get_circuit_breaker"]
+
+
+FAILURES = (ConnectionError, ChunkedEncodingError, Timeout, SystemOffline)
+HALF_OPEN_CALLS = 1
+RESET_TIMEOUT = 60
+THRESHOLD = 3
+
+
+class Circuit:
+    """The circuit of a single system."""
+
+    def __init__(self):
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+        self.probes = 0
+
+    def __repr__(self):
+        return f"<Circuit state={self.state.value} failures={self.failures}>"
+
+
+class Call:
+    """Outcome of a guarded call, which the caller
+    may mark as failed without raising an exception.
+    """
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self) -> None:
+        """Marks the call as failed."""
+        self.failed = True
+
+
+class CircuitBreaker:
+    """Fails calls to systems fast after repeated failures.
+
+    After threshold consecutive failures the circuit of a system opens.
+    Calls to open circuits raise SystemOffline without contacting the
+    system. After the reset timeout, the circuit becomes half-open and
+    lets up to half_open_calls probe calls through. A successful probe
+    closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: int = THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        half_open_calls: int = HALF_OPEN_CALLS,
+    ):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.lock = Lock()
+        self.circuits: dict[int, Circuit] = {}
+
+    def allow(self, system: int) -> bool:
+        """Checks whether a call to the system may be made."""
+        with self.lock:
+            if (circuit := self.circuits.get(system)) is None:
+                return True
+
+            if circuit.state == CircuitState.OPEN:
+                if monotonic() - circuit.opened < self.reset_timeout:
+                    return False
+
+                circuit.state = CircuitState.HALF_OPEN
+                circuit.probes = 0
+
+            if circuit.state == CircuitState.HALF_OPEN:
+                if circuit.probes >= self.half_open_calls:
+                    return False
+
+                circuit.probes += 1
+
+            return True
+
+    def success(self, system: int) -> None:
+        """Records a successful call to the system."""
+        with self.lock:
+            self.circuits.pop(system, None)
+
+    def release(self, system: int) -> None:
+        """Records a call to the system that neither succeeded nor failed,
+        so that a half-open circuit may be probed again.
+        """
+        with self.lock:
+            if (circuit := self.circuits.get(system)) is None:
+                return
+
+            if circuit.state == CircuitState.HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def failure(self, system: int) -> None:
+        """Records a failed call to the system."""
+        with self.lock:
+            circuit = self.circuits.setdefault(system, Circuit())
+            circuit.failures += 1
+
+            if (
+                circuit.state == CircuitState.HALF_OPEN
+                or circuit.failures >= self.threshold
+            ):
+                circuit.state = CircuitState.OPEN
+                circuit.opened = monotonic()
+
+    def state(self, system: int) -> CircuitState:
+        """Returns the state of the system's circuit."""
+        with self.lock:
+            if (circuit := self.circuits.get(system)) is None:
+                return CircuitState.CLOSED
+
+            if (
+                circuit.state == CircuitState.OPEN
+                and monotonic() - circuit.opened >= self.reset_timeout
+            ):
+                return CircuitState.HALF_OPEN
+
+            return circuit.state
+
+    def states(self) -> dict[int, CircuitState]:
+        """Returns the states of all circuits that are not closed."""
+        with self.lock:
+            systems = list(self.circuits)
+
+        return {
+            system: state
+            for system in systems
+            if (state := self.state(system)) != CircuitState.CLOSED
+        }
+
+    def reset(self, system: Optional[int] = None) -> None:
+        """Closes the circuit of the system or all circuits."""
+        with self.lock:
+            if system is None:
+                self.circuits.clear()
+            else:
+                self.circuits.pop(system, None)
+
+    @contextmanager
+    def guard(self, system: int) -> Iterator[Call]:
+        """Guards a call to the system.
+        Raises SystemOffline if the system's circuit is open.
+
+        Connection failures and calls marked as failed count as failures,
+        normal completion as success. Other exceptions, e.g. errors of the
+        caller, count as neither.
+        """
+        if not self.allow(system):
+            raise SystemOffline()
+
+        call = Call()
+
+        try:
+            yield call
+        except FAILURES:
+            self.failure(system)
+            raise
+        except BaseException:
+            self.release(system)
+            raise
+        else:
+            if call.failed:
+                self.failure(system)
+            else:
+                self.success(system)
+
+
+@cache
+def get_circuit_breaker() -> CircuitBreaker:
+    """Returns the configured circuit breaker."""
+
+    config = get_config()
+    return CircuitBreaker(
+        threshold=config.getint("breaker", "threshold", fallback=THRESHOLD),
+        reset_timeout=config.getfloat(
+            "breaker", "reset_timeout", fallback=RESET_TIMEOUT
+        ),
+        half_open_calls=config.getint(
+            "breaker", "half_open_calls", fallback=HALF_OPEN_CALLS
+        ),
+    )
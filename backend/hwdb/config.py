@@ -16,6 +16,7 @@ __all__ = [
     "get_openvpn_network",
     "get_openvpn_server",
     "get_ping",
+    "get_ping_native",
     "get_wireguard_network",
     "get_wireguard_server",
 ]
@@ -44,6 +45,12 @@ def get_ping() -> str:
     return get_config().get("binaries", "PING")
 
 
+def get_ping_native() -> bool:
+    """Returns whether to use the in-process ICMP prober."""
+
+    return get_config().getboolean("ping", "native", fallback=True)
+
+
 def get_wireguard_network() -> IPNetwork:
     """Returns the WireGuard network."""
 
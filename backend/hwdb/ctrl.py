@@ -1,24 +1,76 @@
 """Library for terminal remote control."""
 
-from contextlib import suppress
-from subprocess import DEVNULL, CalledProcessError, check_call
-from typing import Optional
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from functools import lru_cache
+from subprocess import DEVNULL, CalledProcessError, TimeoutExpired, check_call
+from time import perf_counter
+from typing import Any, Iterator, Optional
 from urllib.parse import urljoin
 
-from requests import Timeout, Response, get, post, put
+from requests import Timeout, Response
 from requests.exceptions import ChunkedEncodingError, ConnectionError
 
-from hwdb.config import get_ping
+from hwdb.breaker import get_circuit_breaker
+from hwdb.config import LOGGER, get_ping, get_ping_native
 from hwdb.enumerations import ApplicationMode
 from hwdb.exceptions import SystemOffline
+from hwdb.icmp import ping as icmp_ping
+from hwdb.reachability import get_reachability_cache
+from hwdb.sessions import get_session
+from hwdb.timeouts import DEFAULT_TIMEOUT, SLOW_TIMEOUT, DefaultTimeout, TimeoutSpec
+from hwdb.timeouts import get_latency_tracker
 from hwdb.types import IPSocket
 
 
-__all__ = ["RemoteControllerMixin"]
+__all__ = ["RemoteControllerMixin", "capped", "timeout_cap"]
 
 
+CONNECTIONS = 4096  # Cached deployment connections.
 PORT_DIGSIGCLT = 8000
 PORT_DIGSIGCTL = 5000
+TIMEOUT_CAP: ContextVar[Optional[float]] = ContextVar("timeout_cap", default=None)
+
+
+@contextmanager
+def timeout_cap(seconds: Optional[float]) -> Iterator[None]:
+    """Caps the timeouts of remote control calls within the context."""
+
+    token = TIMEOUT_CAP.set(seconds)
+
+    try:
+        yield
+    finally:
+        TIMEOUT_CAP.reset(token)
+
+
+@lru_cache(maxsize=CONNECTIONS)
+def get_connection(model: type, deployment: int) -> Any:
+    """Returns the internet connection of the deployment.
+    The connections are cached for the lifetime of the process.
+    """
+
+    try:
+        return (
+            model.select(model.id, model.connection)
+            .where(model.id == deployment)
+            .get()
+            .connection
+        )
+    except model.DoesNotExist:
+        return None
+
+
+def capped(timeout: Optional[float]) -> Optional[float]:
+    """Returns the timeout limited by the current cap."""
+
+    if (cap := TIMEOUT_CAP.get()) is None:
+        return timeout
+
+    if timeout is None:
+        return cap
+
+    return min(timeout, cap)
 
 
 class BasicControllerMixin:
@@ -40,15 +92,53 @@ class BasicControllerMixin:
     @property
     def online(self) -> bool:
         """Checks whether the system is online."""
+        return self.is_online()
+
+    def is_online(self, *, timeout: Optional[int] = None, cache: bool = True) -> bool:
+        """Checks whether the system is online within the given timeout.
+        Unless cache is False, recent results from the reachability cache
+        are used and new results are stored in it.
+        """
+        if cache:
+            reachability = get_reachability_cache()
+
+            if (online := reachability.get(self.id, self.ip_address)) is not None:
+                return online
+
         try:
-            self.ping()
-        except CalledProcessError:
-            return False
+            self.ping(timeout=timeout, native=get_ping_native())
+        except (CalledProcessError, TimeoutExpired, SystemOffline):
+            online = False
+        else:
+            online = True
+
+        if cache:
+            reachability.set(self.id, self.ip_address, online)
+
+        return online
+
+    def ping(
+        self, *, count: int = 3, timeout: Optional[int] = None, native: bool = False
+    ) -> int:
+        """Pings the system.
+
+        If native is True, the in-process ICMP prober is used, which raises
+        SystemOffline if the system did not reply. If unprivileged ICMP
+        sockets are not available, this falls back to the ping binary.
+        """
+        timeout = capped(timeout)
+
+        if native:
+            try:
+                rtt = icmp_ping(self.ip_address, count=count, timeout=timeout)
+            except OSError as error:
+                LOGGER.debug("Falling back to ping binary: %s", error)
+            else:
+                if rtt is None:
+                    raise SystemOffline()
 
-        return True
+                return 0
 
-    def ping(self, *, count: int = 3, timeout: Optional[int] = None) -> int:
-        """Pings the system."""
         return check_call(
             [get_ping(), "-qc", str(count), str(self.ip_address)],
             stdout=DEVNULL,
@@ -63,37 +153,118 @@ class BasicControllerMixin:
 
         return urljoin(self.url, endpoint)
 
+    @property
+    def connection_type(self) -> Any:
+        """Returns the internet connection of the deployment, if known."""
+        if (deployment := self.deployment) is None:
+            return None
+
+        if isinstance(deployment, int):  # Deployment was not joined.
+            return get_connection(type(self).deployment.rel_model, deployment)
+
+        return deployment.connection
+
+    def _request(
+        self,
+        method: str,
+        endpoint: Optional[str],
+        *,
+        timeout: TimeoutSpec,
+        stream: bool,
+        **kwargs,
+    ) -> Response:
+        """Executes a request through the system's circuit breaker.
+        Raises SystemOffline if the system recently failed repeatedly.
+        Server errors count as failures of the system.
+        Default timeouts adapt to the system's recorded latencies.
+        """
+        tracker = get_latency_tracker()
+        connection = self.connection_type
+        adaptive = isinstance(timeout, DefaultTimeout)
+        timeout = capped(tracker.resolve(self.id, connection, timeout))
+        start = perf_counter()
+
+        with get_circuit_breaker().guard(self.id) as call:
+            try:
+                response = get_session(self.socket).request(
+                    method,
+                    self.endpoint_url(endpoint),
+                    timeout=timeout,
+                    stream=stream,
+                    **kwargs,
+                )
+            except Timeout:
+                if adaptive:
+                    tracker.record_timeout(self.id)
+
+                raise
+
+            if response.status_code >= 500:
+                call.fail()  # The system's services are broken.
+
+        tracker.record(self.id, connection, perf_counter() - start)
+        return response
+
     def _get(
-        self, *, endpoint: Optional[str] = None, timeout: Optional[int] = 10
+        self,
+        *,
+        endpoint: Optional[str] = None,
+        timeout: TimeoutSpec = DEFAULT_TIMEOUT,
+        stream: bool = False,
     ) -> Response:
-        """Executes a PUT request."""
-        return get(self.endpoint_url(endpoint), timeout=timeout)
+        """Executes a GET request.
+        If stream is True, the body is not read in advance.
+        """
+        return self._request("GET", endpoint, timeout=timeout, stream=stream)
 
     def _post(
-        self, json: dict, *, endpoint: Optional[str] = None, timeout: Optional[int] = 10
+        self,
+        json: dict,
+        *,
+        endpoint: Optional[str] = None,
+        timeout: TimeoutSpec = DEFAULT_TIMEOUT,
+        stream: bool = False,
     ) -> Response:
-        """Executes a PUT request."""
-        return post(self.endpoint_url(endpoint), json=json, timeout=timeout)
+        """Executes a POST request.
+        If stream is True, the body is not read in advance.
+        """
+        return self._request(
+            "POST", endpoint, json=json, timeout=timeout, stream=stream
+        )
 
     def _put(
-        self, json: dict, *, endpoint: Optional[str] = None, timeout: Optional[int] = 10
+        self,
+        json: dict,
+        *,
+        endpoint: Optional[str] = None,
+        timeout: TimeoutSpec = DEFAULT_TIMEOUT,
+        stream: bool = False,
     ) -> Response:
-        """Executes a PUT request."""
-        return put(self.endpoint_url(endpoint), json=json, timeout=timeout)
+        """Executes a PUT request.
+        If stream is True, the body is not read in advance.
+        """
+        return self._request("PUT", endpoint, json=json, timeout=timeout, stream=stream)
 
     def exec(
-        self, command: str, *args: str, _timeout: Optional[int] = 10, **kwargs
+        self,
+        command: str,
+        *args: str,
+        _timeout: TimeoutSpec = DEFAULT_TIMEOUT,
+        _stream: bool = False,
+        **kwargs,
     ) -> Response:
         """Runs the respective command."""
         if self.ddb_os:
-            return self._post({command: None}, endpoint="/rpc", timeout=_timeout)
+            return self._post(
+                {command: None}, endpoint="/rpc", timeout=_timeout, stream=_stream
+            )
 
         json = {"args": args} if args else {}
         json.update(kwargs)
         json["command"] = command
-        return self._put(json, timeout=_timeout)
+        return self._put(json, timeout=_timeout, stream=_stream)
 
-    def sysinfo(self, *, timeout: Optional[int] = 10) -> Response:
+    def sysinfo(self, *, timeout: TimeoutSpec = DEFAULT_TIMEOUT) -> Response:
         """Query system information."""
         if self.ddb_os:
             return self._get(endpoint="/sysinfo", timeout=timeout)
@@ -129,7 +300,9 @@ class RemoteControllerMixin(BasicControllerMixin):
     def chromium_url(self) -> Response:
         """returns a Systems url from chromium perferences"""
         if self.ddb_os:
-            return self._post({"url": None}, endpoint="/configuration", timeout=15)
+            return self._post(
+                {"url": None}, endpoint="/configuration", timeout=SLOW_TIMEOUT
+            )
 
     def application(self, mode: Optional[ApplicationMode] = None) -> Response:
         """Manages the application.
@@ -142,39 +315,49 @@ class RemoteControllerMixin(BasicControllerMixin):
         if self.ddb_os:
             if mode == "PRODUCTIVE":
                 return self._post(
-                    {"operationMode": "chromium"}, endpoint="/rpc", timeout=15
+                    {"operationMode": "chromium"}, endpoint="/rpc", timeout=SLOW_TIMEOUT
                 )
             if mode == "INSTALLATION_INSTRUCTIONS":
                 return self._post(
                     {"operationMode": "installationInstructions"},
                     endpoint="/rpc",
-                    timeout=15,
+                    timeout=SLOW_TIMEOUT,
                 )
-            return self._post({"operationMode": None}, endpoint="/rpc", timeout=15)
+            return self._post(
+                {"operationMode": None}, endpoint="/rpc", timeout=SLOW_TIMEOUT
+            )
 
         try:
             return self.exec("application", mode=mode)
         except (ConnectionError, ChunkedEncodingError, Timeout) as error:
             raise SystemOffline() from error
 
-    def screenshot(self, *, timeout: Optional[int] = 15) -> Response:
-        """Makes a screenshot."""
+    def screenshot(
+        self, *, timeout: TimeoutSpec = SLOW_TIMEOUT, stream: bool = False
+    ) -> Response:
+        """Makes a screenshot.
+        If stream is True, the image is not read in advance.
+        """
         try:
             if self.ddb_os:
-                return self._get(endpoint="/screenshot", timeout=timeout)
+                return self._get(endpoint="/screenshot", timeout=timeout, stream=stream)
 
-            return self.exec("screenshot", _timeout=timeout)
+            return self.exec("screenshot", _timeout=timeout, _stream=stream)
         except (ConnectionError, ChunkedEncodingError, Timeout) as error:
             raise SystemOffline() from error
 
-    def apply_url(self, url: str, *, timeout: Optional[int] = 10) -> Response:
+    def apply_url(
+        self, url: str, *, timeout: TimeoutSpec = DEFAULT_TIMEOUT
+    ) -> Response:
         """Set digital signage URL on new DDB OS systems."""
         try:
             return self._post({"url": url}, endpoint="/configure", timeout=timeout)
         except (ConnectionError, ChunkedEncodingError, Timeout) as error:
             raise SystemOffline() from error
 
-    def restart_web_browser(self, *, timeout: Optional[int] = 10) -> Response:
+    def restart_web_browser(
+        self, *, timeout: TimeoutSpec = DEFAULT_TIMEOUT
+    ) -> Response:
         """Set digital signage URL on new DDB OS systems."""
         try:
             return self._post(
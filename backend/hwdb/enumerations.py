@@ -6,11 +6,13 @@ from enum import Enum, EnumMeta
 __all__ = [
     "from_string",
     "ApplicationMode",
+    "CircuitState",
     "Connection",
     "DeploymentType",
     "HardwareModel",
     "HardwareType",
     "OperatingSystem",
+    "PushStatus",
 ]
 
 
@@ -31,6 +33,14 @@ class ApplicationMode(str, Enum):
     OFF = "off"
 
 
+class CircuitState(str, Enum):
+    """States of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
 class Connection(Enum):
     """Internet connection information."""
 
@@ -78,3 +88,12 @@ class OperatingSystem(Enum):
     WINDOWS8 = "Windows 8"
     WINDOWS81 = "Windows 8.1"
     WINDOWS10 = "Windows 10"
+
+
+class PushStatus(str, Enum):
+    """Status of a URL push."""
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    SUPERSEDED = "superseded"
@@ -0,0 +1,174 @@
+"""Concurrent execution of remote control commands on many systems."""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from operator import methodcaller
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+from hwdb.ctrl import timeout_cap
+from hwdb.orm.system import System
+
+
+__all__ = ["DEADLINE", "WORKERS", "Result", "fanout"]
+
+
+DEADLINE = 10
+POLL = 0.1  # Seconds between deadline checks of queued commands.
+WORKERS = 64
+
+
+class Result(NamedTuple):
+    """Result of a command on a system."""
+
+    system: System
+    response: Any
+    error: Optional[Exception]
+    latency: float  # Seconds.
+
+
+class Task:
+    """A command to run on a system within a deadline."""
+
+    def __init__(
+        self,
+        system: System,
+        command: Callable[[System], Any],
+        deadline: Optional[float],
+    ):
+        self.system = system
+        self.command = command
+        self.deadline = deadline
+        self.start: Optional[float] = None
+
+    def __call__(self) -> Result:
+        """Runs the command on the system with its timeouts capped."""
+        self.start = perf_counter()
+
+        try:
+            with timeout_cap(self.deadline):
+                response = self.command(self.system)
+        except Exception as error:  # pylint: disable=W0703
+            return Result(self.system, None, error, perf_counter() - self.start)
+
+        return Result(self.system, response, None, perf_counter() - self.start)
+
+    def remaining(self, now: float) -> Optional[float]:
+        """Returns the seconds until the deadline or None
+        if the command did not start yet or has no deadline.
+        """
+        if self.start is None or self.deadline is None:
+            return None
+
+        return self.start + self.deadline - now
+
+    def expired(self, now: float) -> Result:
+        """Returns the result of the command exceeding its deadline."""
+        return Result(
+            self.system,
+            None,
+            TimeoutError(f"No result within {self.deadline} seconds."),
+            now - self.start,
+        )
+
+
+def bind(function: Callable, *args, **kwargs) -> Callable[[System], Any]:
+    """Returns a command calling the function with the system
+    followed by the given arguments.
+    """
+
+    def command(system: System) -> Any:
+        return function(system, *args, **kwargs)
+
+    return command
+
+
+def get_timeout(tasks: Iterable[Task], now: float) -> Optional[float]:
+    """Returns the time to wait for the next result or deadline."""
+
+    timeout = None
+
+    for task in tasks:
+        if task.deadline is None:
+            continue
+
+        if (remaining := task.remaining(now)) is None:
+            remaining = POLL
+
+        timeout = max(0, remaining if timeout is None else min(timeout, remaining))
+
+    return timeout
+
+
+def collect(pending: dict[Future, Task]) -> Iterator[Result]:
+    """Waits for finished or expired commands and yields their results.
+    Yielded commands are removed from pending.
+    """
+
+    done, _ = wait(
+        pending,
+        timeout=get_timeout(pending.values(), perf_counter()),
+        return_when=FIRST_COMPLETED,
+    )
+
+    for future in done:
+        del pending[future]
+        yield future.result()
+
+    now = perf_counter()
+
+    for future, task in list(pending.items()):
+        if (remaining := task.remaining(now)) is not None and remaining <= 0:
+            del pending[future]
+            future.cancel()
+            yield task.expired(now)
+
+
+def fanout(
+    systems: Iterable[System],
+    command: Union[str, Callable[[System], Any]],
+    *args,
+    workers: int = WORKERS,
+    deadline: Optional[float] = DEADLINE,
+    **kwargs,
+) -> Iterator[Result]:
+    """Runs the command on the systems concurrently.
+
+    The command is either the name of a method of the systems or a
+    callable taking a system, which is called with the remaining
+    arguments. At most workers commands run at a time, so that
+    arbitrarily large iterables of systems are consumed lazily.
+    The timeouts of each command's requests and pings are capped by the
+    deadline. Commands still running at their deadline, e.g. because the
+    system keeps sending data slowly, are reported with a TimeoutError.
+    Running commands cannot be interrupted, so they keep their thread
+    until they finish. Since the threads are limited to workers, such
+    commands delay the following ones rather than piling up background
+    work against the systems. The deadline of a command starts when it
+    does. Commands that did not start when the iteration ends or is
+    closed are cancelled.
+    The results are yielded in the order in which they arrive.
+    """
+
+    if isinstance(command, str):
+        command = methodcaller(command, *args, **kwargs)
+    elif args or kwargs:
+        command = bind(command, *args, **kwargs)
+
+    pending: dict[Future, Task] = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    try:
+        for system in systems:
+            task = Task(system, command, deadline)
+            pending[executor.submit(task)] = task
+
+            while len(pending) >= workers:
+                yield from collect(pending)
+
+        while pending:
+            yield from collect(pending)
+    finally:
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,42 @@
 """Terminal filters."""
 
-from typing import Iterable, Iterator
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from heapq import heappop, heappush
+from itertools import chain
+from typing import Iterable, Iterator, Optional
 
-from peewee import JOIN, Expression, ModelBase, ModelSelect
+from peewee import JOIN, Expression, Model, ModelBase, ModelSelect, fn
 
 from mdb import Customer
 
-from hwdb.config import LOGGER
+from hwdb.config import LOGGER, get_ping_native
 from hwdb.enumerations import Connection, DeploymentType, OperatingSystem
-from hwdb.orm import Deployment, Group, System
+from hwdb.icmp import Prober
+from hwdb.orm import Deployment, Group, Reachability, System
+from hwdb.orm.deployment import RELATIONS as DEPLOYMENT_RELATIONS
+from hwdb.orm.system import RELATIONS as SYSTEM_RELATIONS
+from hwdb.reachability import get_reachability_cache
+from hwdb.types import IPAddress, ProbeResult
 
 
-__all__ = ["filter_online", "filter_offline", "get_deployments", "get_systems"]
+__all__ = [
+    "filter_online",
+    "filter_offline",
+    "get_deployments",
+    "get_systems",
+    "paginate",
+    "probe",
+    "select_systems",
+    "stream_deployments",
+    "stream_systems",
+]
+
+
+PAGE_SIZE = 500
+PROBE_TIMEOUT = 10
+PROBE_WORKERS = 64
 
 
 def _parse_ids(idents: Iterable[str]) -> Iterator[int]:
@@ -34,20 +59,203 @@ def _get_expression(ids: Iterable[str], model: ModelBase) -> Expression:
     return model.id << ids
 
 
-def filter_online(systems: Iterable[System]) -> Iterator[System]:
-    """Yields online systems."""
+def _ip_address(system: System) -> Optional[IPAddress]:
+    """Returns the system's IP address or None if it has none."""
+
+    try:
+        return system.ip_address
+    except AttributeError:  # No OpenVPN configuration.
+        return None
+
+
+def _probe_threaded(
+    systems: Iterable[System], *, workers: int, timeout: Optional[int]
+) -> Iterator[ProbeResult]:
+    """Probes the systems by running the ping binary in a thread pool."""
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(system.is_online, timeout=timeout, cache=False): system
+            for system in systems
+        }
+
+        for future in as_completed(futures):
+            system = futures[future]
+            yield ProbeResult(system, _ip_address(system), future.result())
+
+
+def _probe_native(
+    systems: Iterable[System], *, timeout: Optional[int]
+) -> Iterator[ProbeResult]:
+    """Probes the systems using the in-process ICMP prober.
+    Raises OSError if unprivileged ICMP sockets are not available.
+    """
+
+    addresses = defaultdict(list)
+    unaddressed = []
+
+    for system in systems:
+        if (address := _ip_address(system)) is None:
+            unaddressed.append(system)
+        else:
+            addresses[address].append(system)
+
+    replies = Prober(timeout=timeout).probe(addresses)
+    unreachable = (ProbeResult(system, None, False) for system in unaddressed)
+    return chain(
+        unreachable,
+        (
+            ProbeResult(system, address, rtt is not None, rtt)
+            for address, rtt in replies
+            for system in addresses[address]
+        ),
+    )
+
+
+def _probe_uncached(
+    systems: list[System],
+    *,
+    workers: int,
+    timeout: Optional[int],
+    native: bool,
+) -> Iterator[ProbeResult]:
+    """Probes the systems with the selected prober."""
+
+    if native:
+        try:
+            return _probe_native(systems, timeout=timeout)
+        except OSError as error:
+            LOGGER.debug("Falling back to ping binary: %s", error)
+
+    return _probe_threaded(systems, workers=workers, timeout=timeout)
+
+
+def _probe(
+    systems: list[System],
+    *,
+    workers: int,
+    timeout: Optional[int],
+    native: bool,
+    cache: bool,
+) -> Iterator[ProbeResult]:
+    """Yields cached results and probes the remaining systems."""
+
+    if not cache:
+        yield from _probe_uncached(
+            systems, workers=workers, timeout=timeout, native=native
+        )
+        return
+
+    reachability = get_reachability_cache()
+    uncached = []
 
     for system in systems:
-        if system.online:
-            yield system
+        if (address := _ip_address(system)) is None:
+            uncached.append(system)
+        elif (online := reachability.get(system.id, address)) is None:
+            uncached.append(system)
+        else:
+            yield ProbeResult(system, address, online)
+
+    results = []
+
+    try:
+        for result in _probe_uncached(
+            uncached, workers=workers, timeout=timeout, native=native
+        ):
+            results.append(result)
+            yield result
+    finally:
+        reachability.store(results)
+
+
+def _ordered(
+    results: Iterable[ProbeResult], systems: list[System]
+) -> Iterator[ProbeResult]:
+    """Yields the results in the order of the given systems.
+    Only results that arrived ahead of their turn are buffered.
+    If results are missing, the buffered ones are yielded in
+    order once the results are exhausted.
+    """
+
+    positions = {id(system): index for index, system in enumerate(systems)}
+    pending: list[tuple[int, ProbeResult]] = []
+    expected = 0
+
+    for result in results:
+        heappush(pending, (positions[id(result.system)], result))
+
+        while pending and pending[0][0] == expected:
+            yield heappop(pending)[1]
+            expected += 1
+
+    while pending:
+        yield heappop(pending)[1]
+
+
+def probe(
+    systems: Iterable[System],
+    *,
+    workers: int = PROBE_WORKERS,
+    timeout: Optional[int] = PROBE_TIMEOUT,
+    ordered: bool = False,
+    native: Optional[bool] = None,
+    cache: bool = True,
+) -> Iterator[ProbeResult]:
+    """Concurrently checks whether the systems are online.
+
+    Yields probe results as soon as the respective probe finishes,
+    unless ordered is set, in which case the results are yielded in
+    the order of the given systems.
+    If native is True, which defaults to the configuration, all systems
+    are probed by the in-process ICMP prober, falling back to running
+    the ping binary in a pool of the given amount of workers.
+    Unless cache is False, recent results from the reachability cache
+    are used and new results are stored in it.
+    """
+
+    systems = list(systems)
+    results = _probe(
+        systems,
+        workers=workers,
+        timeout=timeout,
+        native=get_ping_native() if native is None else native,
+        cache=cache,
+    )
+
+    if not ordered:
+        return results
+
+    return _ordered(results, systems)
+
+
+def filter_online(systems: Iterable[System], **kwargs) -> Iterator[System]:
+    """Yields online systems."""
+
+    for result in probe(systems, **kwargs):
+        if result.online:
+            yield result.system
 
 
-def filter_offline(systems: Iterable[System]) -> Iterator[System]:
+def filter_offline(systems: Iterable[System], **kwargs) -> Iterator[System]:
     """Yields offline systems."""
 
-    for system in systems:
-        if not system.online:
-            yield system
+    for result in probe(systems, **kwargs):
+        if not result.online:
+            yield result.system
+
+
+def _used_by(systems: Iterable[System]) -> Expression:
+    """Returns a semi-join condition for deployments being used
+    as deployment or dataset by any of the given systems.
+    """
+
+    selected = System.id << systems
+    return fn.EXISTS(
+        System.select(System.id).where(selected & (System.deployment == Deployment.id))
+    ) | fn.EXISTS(
+        System.select(System.id).where(selected & (System.dataset == Deployment.id))
+    )
 
 
 def get_deployments(
@@ -58,10 +266,17 @@ def get_deployments(
     connections: Iterable[Connection] = None,
     systems: Iterable[System] = None,
     sort: bool = False,
+    relations: Optional[Iterable[str]] = None,
 ) -> ModelSelect:
-    """Yields deployments."""
+    """Yields deployments.
+    If relations are given, only those and the ones
+    needed by the filters are joined.
+    """
 
-    select = Deployment.select(cascade=True)
+    if relations is None:
+        relations = DEPLOYMENT_RELATIONS - {"systems"}
+
+    select = Deployment.select(cascade=True, relations=relations)
     condition = True
 
     if ids:
@@ -80,11 +295,7 @@ def get_deployments(
         condition &= Deployment.connection << connections
 
     if systems:
-        dataset = System.alias()
-        select = select.join_from(
-            Deployment, dataset, JOIN.LEFT_OUTER, on=Deployment.id == dataset.dataset
-        )
-        condition &= (System.id << systems) | (dataset.id << systems)
+        condition &= _used_by(systems)
 
     select = select.where(condition)
 
@@ -94,8 +305,8 @@ def get_deployments(
     return select
 
 
-def get_systems(
-    ids: Iterable[int],
+def select_systems(
+    ids: Iterable[int] = None,
     customers: Iterable[Customer] = None,
     deployments: Iterable[Deployment] = None,
     datasets: Iterable[Deployment] = None,
@@ -105,10 +316,21 @@ def get_systems(
     operating_systems: Iterable[OperatingSystem] = None,
     groups: Iterable[Group] = None,
     online: bool = None,
-    sort: bool = False,
-) -> Iterator[System]:
-    """Yields systems for the respective expressions and filters."""
-
+    max_age: Optional[timedelta] = None,
+    relations: Optional[Iterable[str]] = None,
+) -> ModelSelect:
+    """Selects systems for the respective expressions and filters.
+    The online filter applies to the recorded reachability not older
+    than max_age, which is thus required. Systems not recorded as online
+    within max_age, including systems never probed, count as offline.
+    If relations are given, only those and the ones
+    needed by the filters are joined.
+    """
+
+    if online is not None and max_age is None:
+        raise ValueError("Filtering by online state requires max_age.")
+
+    relations = SYSTEM_RELATIONS if relations is None else set(relations)
     condition = True
 
     if ids:
@@ -116,6 +338,7 @@ def get_systems(
 
     if customers:
         condition &= Deployment.customer << customers
+        relations |= {"deployment"}
 
     if deployments:
         condition &= System.deployment << deployments
@@ -144,17 +367,135 @@ def get_systems(
     if groups:
         condition &= System.group << groups
 
-    select = System.select(cascade=True).where(condition)
+    select = System.select(cascade=True, relations=relations)
+
+    if online is not None:
+        select = select.join_from(
+            System,
+            Reachability,
+            join_type=JOIN.INNER if online else JOIN.LEFT_OUTER,
+            on=(Reachability.system == System.id)
+            & Reachability.condition(True, max_age),
+        )
+
+        if not online:
+            condition &= Reachability.system >> None
+
+    return select.where(condition)
+
+
+def get_systems(
+    ids: Iterable[int],
+    customers: Iterable[Customer] = None,
+    deployments: Iterable[Deployment] = None,
+    datasets: Iterable[Deployment] = None,
+    configured: bool = None,
+    deployed: bool = None,
+    fitted: bool = None,
+    operating_systems: Iterable[OperatingSystem] = None,
+    groups: Iterable[Group] = None,
+    online: bool = None,
+    sort: bool = False,
+    workers: int = PROBE_WORKERS,
+    timeout: Optional[int] = PROBE_TIMEOUT,
+    cache: bool = True,
+    max_age: Optional[timedelta] = None,
+    relations: Optional[Iterable[str]] = None,
+) -> Iterator[System]:
+    """Yields systems for the respective expressions and filters.
+
+    If online is not None, the systems are probed concurrently by up to
+    the given amount of workers, each probe being limited to timeout
+    seconds. Probed systems are yielded as soon as their probe finished,
+    unless sort is set, in which case they are yielded ordered by ID.
+    Set cache to False to bypass the reachability cache.
+    If max_age is given, the systems are not probed. Instead the recorded
+    reachability not older than max_age is queried by the database.
+    If relations are given, only those and the ones
+    needed by the filters are joined.
+    """
+
+    if relations is not None and online is not None and max_age is None:
+        relations = {*relations, "openvpn"}  # Needed for probing.
+
+    select = select_systems(
+        ids=ids,
+        customers=customers,
+        deployments=deployments,
+        datasets=datasets,
+        configured=configured,
+        deployed=deployed,
+        fitted=fitted,
+        operating_systems=operating_systems,
+        groups=groups,
+        online=None if max_age is None else online,
+        max_age=max_age,
+        relations=relations,
+    )
 
     if sort:
         select = select.order_by(System.id)
 
     select = select.iterator()
 
-    if online is None:
+    if online is None or max_age is not None:
         return select
 
+    kwargs = {"workers": workers, "timeout": timeout, "ordered": sort, "cache": cache}
+
     if online:
-        return filter_online(select)
+        return filter_online(select, **kwargs)
+
+    return filter_offline(select, **kwargs)
+
+
+def paginate(
+    select: ModelSelect,
+    model: ModelBase,
+    *,
+    page_size: int = PAGE_SIZE,
+    cursor: Optional[int] = None,
+) -> Iterator[Model]:
+    """Lazily yields the records of the select ordered by the model's ID.
+
+    Records are fetched page-wise using keyset pagination, so that at most
+    page_size records are held in memory. To resume an interrupted
+    iteration, pass the ID of the last consumed record as cursor.
+    """
+
+    while True:
+        page = select if cursor is None else select.where(model.id > cursor)
+        size = 0
+
+        for size, record in enumerate(
+            page.order_by(model.id).limit(page_size).iterator(), start=1
+        ):
+            cursor = record.id
+            yield record
+
+        if size < page_size:
+            return
+
+
+def stream_deployments(
+    *, page_size: int = PAGE_SIZE, cursor: Optional[int] = None, **filters
+) -> Iterator[Deployment]:
+    """Lazily yields deployments page-wise ordered by ID.
+    Takes the same filters as get_deployments().
+    """
+
+    return paginate(
+        get_deployments(**filters), Deployment, page_size=page_size, cursor=cursor
+    )
+
+
+def stream_systems(
+    *, page_size: int = PAGE_SIZE, cursor: Optional[int] = None, **filters
+) -> Iterator[System]:
+    """Lazily yields systems page-wise ordered by ID.
+    Takes the same filters as select_systems().
+    """
 
-    return filter_offline(select)
+    return paginate(
+        select_systems(**filters), System, page_size=page_size, cursor=cursor
+    )
@@ -1,10 +1,30 @@
 """Post DB transaction hooks."""
 
+from hwdb.hooks import bind9, openvpn, wireguard
 from hwdb.hooks.bind9 import bind9cfgen
 from hwdb.hooks.openvpn import openvpncfgen
+from hwdb.hooks.wireguard import wireguardcfgen
 
 
-__all__ = ["HOOKS", "bind9cfgen", "openvpncfgen"]
+__all__ = [
+    "HOOKS",
+    "RELATIONS",
+    "SELECTIVE",
+    "TRIGGERS",
+    "bind9cfgen",
+    "openvpncfgen",
+    "wireguardcfgen",
+]
 
 
-HOOKS = {"bind9": bind9cfgen, "openvpn": openvpncfgen}
+HOOKS = {"bind9": bind9cfgen, "openvpn": openvpncfgen, "wireguard": wireguardcfgen}
+RELATIONS = bind9.RELATIONS | openvpn.RELATIONS | wireguard.RELATIONS
+# Hooks that can be limited to the affected systems. The bind9 zone and
+# the WireGuard peers are whole artefacts listing all systems, of which
+# only the differences are applied, so these hooks need all systems.
+SELECTIVE = frozenset({"openvpn"})
+TRIGGERS = {
+    "bind9": bind9.TRIGGERS,
+    "openvpn": openvpn.TRIGGERS,
+    "wireguard": wireguard.TRIGGERS,
+}
@@ -1,79 +1,217 @@
 """Generates bind9 configuration for HOMEINFO's VPN networks."""
 
+from datetime import date
 from logging import getLogger
 from os import linesep
 from pathlib import Path
-from subprocess import CalledProcessError
-from typing import Iterator
+from string import Formatter
+from subprocess import CalledProcessError, run
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
 
+from hwdb.config import get_config
+from hwdb.hooks.common import ArtefactWriter, get_state_file, load_state, save_state
+from hwdb.orm.mixins import DOMAIN
 from hwdb.orm.system import System
 from hwdb.system import root, systemctl
 
 
-__all__ = ["bind9cfgen"]
+__all__ = ["RELATIONS", "TRIGGERS", "Record", "bind9cfgen", "nsupdate"]
 
 
 BIND9_SERVICE = "bind9.service"
 DNS_CONFIG = Path("/etc/bind/homeinfo.intranet.zone")
 DNS_TEMPLATE = Path("/usr/share/terminals/homeinfo.intranet.zone.temp")
-IN_A_RECORD = "{}\tIN\tA\t{}"
-IN_AAAA_RECORD = "{}\tIN\tAAAA\t{}"
 LOCAL_HOSTS_LIST = Path("/usr/local/etc/local_hosts")
 LOGGER = getLogger("bind9")
+MODES = {"nsupdate", "reload", "restart"}
+NSUPDATE = "/usr/bin/nsupdate"
+RELATIONS = frozenset({"openvpn"})
+STATE_FILE = "bind9.json"
+TTL = 86400
+TRIGGERS = frozenset(
+    {"system.ipv6address", "system.openvpn", "system.pubkey", "openvpn.ipv4address"}
+)
 
 
-def management_hosts() -> Iterator[str]:
-    """Renders management network hosts."""
+class Record(NamedTuple):
+    """A DNS resource record relative to the zone's origin."""
+
+    name: str
+    type: str
+    address: str
+
+    def __str__(self):
+        return f"{self.name}\tIN\t{self.type}\t{self.address}"
+
+    def fqdn(self, zone: str) -> str:
+        """Returns the absolute domain name of the record."""
+        if self.name.endswith("."):
+            return self.name
+
+        return f"{self.name}.{zone}."
+
+
+def get_mode() -> str:
+    """Returns the configured update mode."""
+
+    if (mode := get_config().get("bind9", "mode", fallback="reload")) in MODES:
+        return mode
+
+    LOGGER.warning("Invalid bind9 mode: %s. Falling back to restart.", mode)
+    return "restart"
+
+
+def management_hosts() -> Iterator[Record]:
+    """Yields management network hosts."""
 
     try:
         with LOCAL_HOSTS_LIST.open("r", encoding="utf-8") as file:
-            yield ";# Management network hosts\n"
-
             for line in file:
                 if (line := line.strip()) and not line.startswith("#"):
-                    yield IN_A_RECORD.format(*line.split())
+                    name, address, *_ = line.split()
+                    yield Record(name, "A", address)
     except FileNotFoundError:
         return
 
 
-def terminal_hosts() -> Iterator[str]:
-    """Renders terminal network hosts."""
-
-    yield ";# Terminal network hosts\n"
+def terminal_hosts(systems: Iterable[System]) -> Iterator[Record]:
+    """Yields terminal network hosts."""
 
-    for system in System.select(cascade=True).where(True):
+    for system in systems:
         try:
             ipv4address = system.openvpn.ipv4address
         except AttributeError:
             LOGGER.warning("No OpenVPN config for #%i.", system.id)
         else:
-            yield IN_A_RECORD.format(system.hostname, ipv4address)
+            yield Record(system.hostname, "A", str(ipv4address))
 
         if system.pubkey is not None:
-            yield IN_AAAA_RECORD.format(system.hostname, system.ipv6address)
+            yield Record(system.hostname, "AAAA", str(system.ipv6address))
         else:
             LOGGER.warning("No WireGuard config for #%i.", system.id)
 
 
-@root(LOGGER)
-def bind9cfgen() -> bool:
-    """Runs generates the confi files."""
+def next_serial(serial: int) -> int:
+    """Returns the next zone serial in YYYYMMDDNN format."""
+
+    return max(serial + 1, int(date.today().strftime("%Y%m%d00")))
+
+
+def write_records(zone: ArtefactWriter, title: str, records: list[Record]) -> None:
+    """Streams the records below a title comment."""
+
+    zone.write(f";# {title}\n")
+
+    for record in records:
+        zone.write(linesep + str(record))
+
+
+def render(
+    zone: ArtefactWriter, management: list[Record], terminals: list[Record], serial: int
+) -> None:
+    """Streams the zone file.
+    The serial is not hashed, so that the digest only reflects the records.
+    """
 
     with DNS_TEMPLATE.open("r", encoding="utf-8") as temp:
         template = temp.read()
 
-    management = linesep.join(management_hosts())
-    terminals = linesep.join(terminal_hosts())
-    config = template.format(file=__file__, management=management, terminals=terminals)
+    for literal, field, _, _ in Formatter().parse(template):
+        zone.write(literal)
+
+        if field is None:
+            continue
+
+        if field == "file":
+            zone.write(__file__)
+        elif field == "serial":
+            zone.write(str(serial), hashed=False)
+        elif field == "management":
+            if management:
+                write_records(zone, "Management network hosts", management)
+        elif field == "terminals":
+            write_records(zone, "Terminal network hosts", terminals)
+        else:
+            raise KeyError(field)
 
-    with DNS_CONFIG.open("w", encoding="utf-8") as dns_cfg:
-        dns_cfg.write(config)
 
-    LOGGER.info("Restarting bind9 service.")
+def nsupdate(removed: Iterable[Record], added: Iterable[Record]) -> None:
+    """Applies the changes as RFC 2136 dynamic updates using nsupdate."""
 
-    try:
-        systemctl("restart", BIND9_SERVICE)
-    except CalledProcessError:
-        return False
+    zone = get_config().get("bind9", "zone", fallback=DOMAIN)
+    ttl = get_config().getint("bind9", "ttl", fallback=TTL)
+    lines = [f"zone {zone}."]
+
+    for record in removed:
+        lines.append(
+            f"update delete {record.fqdn(zone)} {record.type} {record.address}"
+        )
+
+    for record in added:
+        lines.append(
+            f"update add {record.fqdn(zone)} {ttl} {record.type} {record.address}"
+        )
+
+    lines.append("send")
+    run([NSUPDATE, "-l"], input=linesep.join(lines) + linesep, text=True, check=True)
+
+
+@root(LOGGER)
+def bind9cfgen(
+    systems: Optional[Iterable[System]] = None, *, updater: Callable = nsupdate
+) -> bool:
+    """Runs generates the confi files.
+
+    Only changed records are applied. In nsupdate mode, they are sent
+    to the server as dynamic updates by the given updater. Otherwise,
+    the zone is streamed to a temporary file and only replaced if its
+    digest, which excludes the serial, changed. In this case, the serial
+    is bumped and the server is reloaded or restarted respectively.
+    The applied records and the zone digest are stored in a state file.
+    If no systems are given, they are selected from the database.
+    """
+
+    state = load_state(state_file := get_state_file(STATE_FILE))
+    old = {Record(*record) for record in state.get("records", [])}
+    management = list(management_hosts())
+
+    if systems is None:
+        systems = System.select(cascade=True, relations=RELATIONS).where(True)
+
+    terminals = list(terminal_hosts(systems))
+    records = {*management, *terminals}
+    added, removed = records - old, old - records
+
+    if (mode := get_mode()) == "nsupdate":
+        if "records" in state and not added and not removed:
+            LOGGER.info("DNS records are up to date.")
+            return True
+
+        LOGGER.info("Adding %i and removing %i DNS records.", len(added), len(removed))
+
+        try:
+            updater(sorted(removed), sorted(added))
+        except CalledProcessError:
+            return False
+    else:
+        serial = next_serial(state.get("serial", 0))
+
+        with ArtefactWriter(DNS_CONFIG) as zone:
+            render(zone, management, terminals, serial)
+
+            if not zone.commit(state.get("digest")):
+                LOGGER.info("DNS zone is up to date.")
+                return True
+
+        LOGGER.info("%s bind9 service.", mode.capitalize())
+
+        try:
+            systemctl("restart" if mode == "restart" else "reload", BIND9_SERVICE)
+        except CalledProcessError:
+            return False
+
+        state["serial"], state["digest"] = serial, zone.digest
 
+    state["records"] = sorted(records)
+    save_state(state_file, state)
     return True
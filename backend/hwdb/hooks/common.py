@@ -0,0 +1,121 @@
+"""Common functions for post-transaction hooks."""
+
+from __future__ import annotations
+from hashlib import sha256
+from json import dump, load
+from os import chmod
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Optional
+
+from hwdb.config import get_config
+
+
+__all__ = [
+    "ArtefactWriter",
+    "get_state_file",
+    "load_state",
+    "save_state",
+    "write_atomic",
+]
+
+
+STATE_DIR = "/var/lib/hwdb"
+
+
+def get_state_file(name: str) -> Path:
+    """Returns the path of the hook's state file."""
+
+    return Path(get_config().get("hooks", "state_dir", fallback=STATE_DIR)) / name
+
+
+def load_state(path: Path) -> dict:
+    """Loads the hook's state from the given file."""
+
+    try:
+        with path.open("r", encoding="utf-8") as file:
+            return load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(path: Path, state: dict) -> None:
+    """Atomically stores the hook's state in the given file."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", delete=False
+    ) as tmp:
+        dump(state, tmp)
+
+    Path(tmp.name).replace(path)
+
+
+def write_atomic(path: Path, text: str, *, mode: int = 0o644) -> None:
+    """Atomically replaces the file's content."""
+
+    with NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", delete=False
+    ) as tmp:
+        tmp.write(text)
+
+    chmod(tmp.name, mode)
+    Path(tmp.name).replace(path)
+
+
+class ArtefactWriter:
+    """Streams a generated file to a temporary file while hashing it.
+
+    The target file is only replaced on commit if the digest differs
+    from the one of the previous run, so that unchanged artefacts
+    neither cause writes nor service reloads.
+    """
+
+    def __init__(self, path: Path, *, mode: int = 0o644):
+        self.path = path
+        self.mode = mode
+        self.hash = sha256()
+        self.file = None
+
+    def __enter__(self) -> ArtefactWriter:
+        self.file = NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=self.path.parent,
+            prefix=f".{self.path.name}.",
+            delete=False,
+        )
+        return self
+
+    def __exit__(self, *_):
+        self.file.close()
+        Path(self.file.name).unlink(missing_ok=True)
+
+    @property
+    def digest(self) -> str:
+        """Returns the hex digest of the hashed content."""
+        return self.hash.hexdigest()
+
+    def write(self, text: str, *, hashed: bool = True) -> None:
+        """Writes the text to the temporary file.
+        Volatile content like serials should not be hashed.
+        """
+        self.file.write(text)
+
+        if hashed:
+            self.hash.update(text.encode())
+
+    def commit(self, digest: Optional[str]) -> bool:
+        """Replaces the target file unless it exists and the
+        given digest of the previous run matches the content.
+        Returns True if the file was replaced.
+        """
+        self.file.close()
+
+        if digest == self.digest and self.path.exists():
+            return False
+
+        chmod(self.file.name, self.mode)
+        Path(self.file.name).replace(self.path)
+        return True
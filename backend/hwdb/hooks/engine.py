@@ -0,0 +1,79 @@
+"""Concurrent execution of post-transaction hooks."""
+
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from time import perf_counter
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from hwdb.hooks import RELATIONS
+from hwdb.orm.system import System
+
+
+__all__ = ["HookResult", "get_snapshot", "run_hook", "run_hooks"]
+
+
+LOGGER = getLogger("hooks")
+
+
+class HookResult(NamedTuple):
+    """Result of a hook run."""
+
+    name: str
+    success: bool
+    duration: float  # Seconds.
+    error: Optional[Exception] = None
+
+
+def get_snapshot(relations: Iterable[str] = RELATIONS) -> list[System]:
+    """Selects the systems shared by the hooks."""
+
+    return list(System.select(cascade=True, relations=relations).where(True))
+
+
+def run_hook(
+    hook: Callable, systems: list[System], affected: Optional[set[int]] = None
+) -> HookResult:
+    """Runs the hook on the given systems.
+    If the IDs of the affected systems are given, they are passed on.
+    """
+
+    start = perf_counter()
+
+    try:
+        if affected is None:
+            success = hook(systems) is not False
+        else:
+            success = hook(systems, affected=affected) is not False
+    except Exception as error:  # pylint: disable=W0703
+        LOGGER.exception("Hook %s failed.", hook.__name__)
+        return HookResult(hook.__name__, False, perf_counter() - start, error)
+
+    return HookResult(hook.__name__, success, perf_counter() - start)
+
+
+def run_hooks(
+    hooks: Iterable[Callable],
+    *,
+    systems: Optional[list[System]] = None,
+    workers: Optional[int] = None,
+    affected: Optional[dict[Callable, set[int]]] = None,
+) -> list[HookResult]:
+    """Runs the hooks concurrently on a shared snapshot of the systems.
+    Hooks which are mapped to the IDs of the affected
+    systems may limit their work to those.
+    Returns the results in the order of the hooks.
+    """
+
+    if not (hooks := list(hooks)):
+        return []
+
+    if systems is None:
+        systems = get_snapshot()
+
+    with ThreadPoolExecutor(max_workers=workers or len(hooks)) as executor:
+        return list(
+            executor.map(
+                lambda hook: run_hook(hook, systems, (affected or {}).get(hook)),
+                hooks,
+            )
+        )
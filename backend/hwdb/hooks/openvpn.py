@@ -5,21 +5,26 @@ from logging import getLogger
 from os import linesep
 from pathlib import Path
 from subprocess import CalledProcessError
-from typing import Iterable
+from typing import Iterable, Optional
 
 from hwdb.config import get_config, get_openvpn_network
-from hwdb.exceptions import NoConnection
+from hwdb.hooks.common import get_state_file, load_state, save_state, write_atomic
 from hwdb.orm.openvpn import OpenVPN
 from hwdb.orm.system import System
 from hwdb.system import root, systemctl
 from hwdb.types import IPNetwork
 
 
-__all__ = ["openvpncfgen"]
+__all__ = ["RELATIONS", "TRIGGERS", "openvpncfgen"]
 
 
 LOGGER = getLogger("openvpn")
 OPENVPN_SERVICE = "openvpn-server@terminals.service"
+RELATIONS = frozenset({"openvpn"})
+STATE_FILE = "openvpn.json"
+TRIGGERS = frozenset(
+    {"system.openvpn", "openvpn.ipv4address", "openvpn.key", "openvpn.mtu"}
+)
 ROUTE = 'push "route {network.network_address} {network.netmask} {nexthop}"'
 TEMPLATE = """# Generated by openvpncfg-gen.
 # DO NOT EDIT THIS FILE MANUALLY!
@@ -64,47 +69,112 @@ def get_openvpn_config(system: System, openvpn: OpenVPN) -> str:
     return config
 
 
-def write_config_file(system: System):
-    """Returns the OpenVPN configuration for the respective system."""
+def render_config_files(systems: Iterable[System]) -> dict[str, str]:
+    """Renders the configuration files by their file names."""
 
-    openvpn = system.openvpn
+    configs = {}
 
-    if openvpn is None:
-        raise NoConnection()
+    for system in systems:
+        if (openvpn := system.openvpn) is None:
+            LOGGER.warning("System %i has no VPN configuration.", system.id)
+            continue
 
-    with get_clients_dir().joinpath(openvpn.filename).open("w") as cfg:
-        cfg.write(get_openvpn_config(system, openvpn))
+        configs[openvpn.filename] = get_openvpn_config(system, openvpn)
 
+    return configs
 
-def write_config_files(systems: Iterable[System]):
-    """Generates the respective configuration files."""
 
-    for system in systems:
-        try:
-            write_config_file(system)
-        except NoConnection:
-            LOGGER.warning("System %i has no VPN configuration.", system.id)
+def sync_config_files(
+    configs: dict[str, str], *, filenames: Optional[set[str]] = None
+) -> int:
+    """Writes changed configuration files and removes orphans.
+    If file names are given, only those files are compared.
+    Returns the amount of changed files.
+    """
+
+    clients_dir = get_clients_dir()
+    changed = 0
+
+    for filename, config in configs.items():
+        if filenames is not None and filename not in filenames:
+            continue
+
+        path = clients_dir / filename
 
+        try:
+            current = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            current = None
 
-def remove_config_files():
-    """Removes all existing client config files."""
+        if current != config:
+            write_atomic(path, config)
+            changed += 1
 
-    for file in get_clients_dir().glob("*"):
-        if file.is_file():
+    for file in clients_dir.glob("*"):
+        if file.is_file() and file.name not in configs:
             file.unlink()
+            changed += 1
+
+    return changed
+
+
+def get_server_settings() -> str:
+    """Returns the server-level settings the client configs depend on."""
+
+    return " ".join(map(str, [get_openvpn_network(), *get_routes()]))
 
 
 @root(LOGGER)
-def openvpncfgen() -> bool:
-    """Runs the OpenVPN config generator."""
+def openvpncfgen(
+    systems: Optional[Iterable[System]] = None, *, affected: Optional[set[int]] = None
+) -> bool:
+    """Runs the OpenVPN config generator.
+
+    The client configs are read by the server when a client connects,
+    so only changed files are replaced and the server is only restarted
+    if the server-level settings changed. On the first run, the current
+    settings are recorded as those the running server was started with.
+    If the IDs of the affected systems are given, only their client
+    configs are compared with the files. Orphans are removed anyway.
+    If no systems are given, they are selected from the database.
+    """
+
+    if systems is None:
+        systems = System.select(cascade=True, relations=RELATIONS).where(True)
+
+    systems, filenames = list(systems), None
+
+    if affected is not None:
+        filenames = {
+            system.openvpn.filename
+            for system in systems
+            if system.id in affected and system.openvpn is not None
+        }
 
     LOGGER.info("Generating configuration.")
-    remove_config_files()
-    write_config_files(System.select(cascade=True).where(True))
+    configs = render_config_files(systems)
+    LOGGER.info(
+        "Changed %i client configs.", sync_config_files(configs, filenames=filenames)
+    )
+    state = load_state(state_file := get_state_file(STATE_FILE))
+    server = get_server_settings()
+
+    if "server" not in state:
+        LOGGER.info("Recording server settings: %s", server)
+        state["server"] = server
+        save_state(state_file, state)
+        return True
+
+    if state["server"] == server:
+        return True
+
+    LOGGER.info("Restarting OpenVPN server.")
 
     try:
         systemctl("restart", OPENVPN_SERVICE)
     except CalledProcessError:
         return False
 
+    state["server"] = server
+    save_state(state_file, state)
     return True
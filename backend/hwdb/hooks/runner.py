@@ -0,0 +1,204 @@
+"""Coalescing runner of post-transaction hooks."""
+
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timedelta
+from logging import DEBUG, INFO, basicConfig, getLogger
+from time import monotonic, sleep
+from typing import Callable, Iterable, Optional
+
+from hwdb.config import LOG_FORMAT, get_config
+from hwdb.hooks import HOOKS, SELECTIVE, TRIGGERS
+from hwdb.hooks.engine import run_hooks
+from hwdb.orm.journal import Change
+
+
+__all__ = ["get_triggered", "prune", "run_pending", "main"]
+
+
+ENABLED = "bind9 openvpn"
+INTERVAL = 5
+LOGGER = getLogger("hwdb-hooks")
+MAX_DELAY = 60
+RETENTION = 7 * 86400
+WINDOW = 10
+
+
+def get_triggered(
+    changes: Iterable[Change], triggers: dict[str, Iterable[str]]
+) -> dict[str, set[Optional[int]]]:
+    """Returns the affected system IDs by the names of the triggered hooks."""
+
+    triggered = {}
+
+    for change in changes:
+        for name, fields in triggers.items():
+            if change.triggers(fields):
+                triggered.setdefault(name, set()).add(change.system)
+
+    return triggered
+
+
+def last_pending() -> Optional[int]:
+    """Returns the ID of the last pending change."""
+
+    return Change.pending().order_by(Change.id.desc()).limit(1).scalar()
+
+
+def debounce(last: int, *, window: float, max_delay: float) -> int:
+    """Waits until no new changes arrived within the window or
+    until the maximum delay elapsed.
+    Returns the ID of the last pending change.
+    """
+
+    deadline = monotonic() + max_delay
+
+    while (remaining := deadline - monotonic()) > 0:
+        sleep(min(window, remaining))
+
+        if (newest := last_pending()) == last:
+            break
+
+        last = newest
+
+    return last
+
+
+def run_pending(
+    hooks: dict[str, Callable] = HOOKS,
+    *,
+    window: float = WINDOW,
+    max_delay: float = MAX_DELAY,
+) -> Optional[bool]:
+    """Runs each hook that is triggered by pending changes once.
+
+    Selective hooks only process the affected systems, unless a change
+    could not be attributed to a system. The other hooks render their
+    artefacts from all systems and apply only the differences.
+    Returns None if there were no pending changes,
+    otherwise whether all triggered hooks succeeded.
+    """
+
+    if (last := last_pending()) is None:
+        return None
+
+    last = debounce(last, window=window, max_delay=max_delay)
+    changes = Change.pending().where(Change.id <= last)
+    triggered, affected = [], {}
+
+    for name, systems in get_triggered(changes, TRIGGERS).items():
+        if name not in hooks:
+            continue
+
+        LOGGER.info(
+            "Running hook %s for systems: %s",
+            name,
+            ", ".join(sorted(str(system) for system in systems if system)) or "-",
+        )
+        triggered.append(hook := hooks[name])
+
+        if name in SELECTIVE and None not in systems:
+            affected[hook] = systems
+
+    results = run_hooks(triggered, affected=affected)
+
+    for result in results:
+        LOGGER.info(
+            "Hook %s %s after %.2f seconds.",
+            result.name,
+            "succeeded" if result.success else "failed",
+            result.duration,
+        )
+
+    if success := all(result.success for result in results):
+        Change.update(processed=datetime.now()).where(
+            (Change.processed >> None) & (Change.id <= last)
+        ).execute()
+
+    return success
+
+
+def prune(*, retention: float = RETENTION) -> int:
+    """Deletes changes processed longer than retention seconds ago.
+    Returns the amount of deleted changes.
+    """
+
+    if pruned := Change.prune(datetime.now() - timedelta(seconds=retention)):
+        LOGGER.debug("Pruned %i processed changes.", pruned)
+
+    return pruned
+
+
+def get_args() -> Namespace:
+    """Parses the command line arguments."""
+
+    config = get_config()
+    parser = ArgumentParser(description="Runs post-transaction hooks on changes.")
+    parser.add_argument(
+        "-H",
+        "--hooks",
+        nargs="*",
+        choices=HOOKS,
+        default=config.get("hooks", "enabled", fallback=ENABLED).split(),
+        help="a list of hooks to run",
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=float,
+        default=config.getfloat("hooks", "window", fallback=WINDOW),
+        metavar="seconds",
+        help="time without further changes before running the hooks",
+    )
+    parser.add_argument(
+        "-m",
+        "--max-delay",
+        type=float,
+        default=config.getfloat("hooks", "max_delay", fallback=MAX_DELAY),
+        metavar="seconds",
+        help="maximum time to defer the hooks during bursts of changes",
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=config.getfloat("hooks", "interval", fallback=INTERVAL),
+        metavar="seconds",
+        help="polling interval of the change journal",
+    )
+    parser.add_argument(
+        "-r",
+        "--retention",
+        type=float,
+        default=config.getfloat("hooks", "retention", fallback=RETENTION),
+        metavar="seconds",
+        help="time to keep processed changes",
+    )
+    parser.add_argument(
+        "-1", "--once", action="store_true", help="process pending changes and exit"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="turn on verbose logging"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs the hook runner daemon."""
+
+    args = get_args()
+    basicConfig(level=DEBUG if args.verbose else INFO, format=LOG_FORMAT)
+    hooks = {name: HOOKS[name] for name in args.hooks}
+
+    while True:
+        result = run_pending(hooks, window=args.window, max_delay=args.max_delay)
+
+        if result:
+            prune(retention=args.retention)
+
+        if args.once:
+            return 0 if result is not False else 1
+
+        if result is None:
+            sleep(args.interval)
+        elif result is False:
+            sleep(args.window)
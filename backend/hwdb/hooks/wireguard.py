@@ -0,0 +1,149 @@
+"""Synchronizes the WireGuard peers of the terminal network."""
+
+from logging import getLogger
+from pathlib import Path
+from subprocess import CalledProcessError, check_call
+from typing import Iterable, Optional
+
+from hwdb.config import get_config
+from hwdb.hooks.common import ArtefactWriter, get_state_file, load_state, save_state
+from hwdb.orm.system import System
+from hwdb.system import root
+
+
+__all__ = ["RELATIONS", "TRIGGERS", "render", "wireguardcfgen"]
+
+
+INTERFACE = "terminals"
+LISTEN_PORT = 51820
+LOGGER = getLogger("wireguard")
+PRIVATE_KEY_FILE = "/etc/wireguard/terminals.key"
+RELATIONS = frozenset()
+STATE_FILE = "wireguard.json"
+SYNC_FILE = "/etc/wireguard/terminals.syncconf"
+TRIGGERS = frozenset({"system.ipv6address", "system.pubkey"})
+WG = "/usr/bin/wg"
+
+
+def get_private_key() -> Optional[str]:
+    """Returns the server's private key."""
+
+    path = Path(
+        get_config().get("WireGuard", "private_key_file", fallback=PRIVATE_KEY_FILE)
+    )
+
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+
+def get_dry_run() -> Optional[Path]:
+    """Returns the configured dry run file."""
+
+    if (path := get_config().get("WireGuard", "dry_run", fallback=None)) is None:
+        return None
+
+    return Path(path)
+
+
+def render(
+    file: ArtefactWriter,
+    systems: Iterable[System],
+    *,
+    private_key: Optional[str] = None,
+) -> int:
+    """Streams the peer configuration in wg(8) format.
+    Returns the amount of peers.
+    """
+
+    peers = 0
+    file.write(f"# Generated by {__file__}\n# DO NOT EDIT THIS FILE MANUALLY!\n\n")
+    file.write("[Interface]\n")
+    port = get_config().getint("WireGuard", "listen_port", fallback=LISTEN_PORT)
+    file.write(f"ListenPort = {port}\n")
+
+    if private_key is not None:
+        file.write(f"PrivateKey = {private_key}\n")
+
+    for system in sorted(systems, key=lambda system: system.id):
+        if system.pubkey is None or system.ipv6address is None:
+            continue
+
+        file.write(f"\n[Peer]\n# System ID: {system.id}\n")
+        file.write(f"PublicKey = {system.pubkey}\n")
+        file.write(f"AllowedIPs = {system.ipv6address}/128\n")
+        peers += 1
+
+    return peers
+
+
+def dry_run(path: Path, systems: Iterable[System]) -> bool:
+    """Renders the peer configuration to the given file
+    without applying it to the interface.
+    """
+
+    with ArtefactWriter(path) as file:
+        LOGGER.info("Rendered %i peers to %s.", render(file, systems), path)
+        file.commit(None)
+
+    return True
+
+
+@root(LOGGER)
+def syncconf(systems: Iterable[System]) -> bool:
+    """Applies the peer configuration to the interface.
+
+    Like wg syncconf, only changed peers are added, updated or removed,
+    so that the sessions of other peers are not disrupted. The
+    configuration is applied on every run, since the interface may have
+    lost its peers, e.g. after a restart, and wg syncconf is idempotent.
+    The file is only rewritten if its digest changed.
+    """
+
+    config = get_config()
+    interface = config.get("WireGuard", "interface", fallback=INTERFACE)
+    path = Path(config.get("WireGuard", "sync_file", fallback=SYNC_FILE))
+
+    if (private_key := get_private_key()) is None:
+        LOGGER.error("Private key of interface %s not found.", interface)
+        return False
+
+    state = load_state(state_file := get_state_file(STATE_FILE))
+
+    with ArtefactWriter(path, mode=0o600) as file:
+        peers = render(file, systems, private_key=private_key)
+
+        if not file.commit(state.get("digest")):
+            LOGGER.debug("WireGuard peer file %s is up to date.", path)
+
+    LOGGER.info("Synchronizing %i peers on interface %s.", peers, interface)
+
+    try:
+        check_call([WG, "syncconf", interface, str(path)])
+    except CalledProcessError:
+        return False
+
+    state["digest"] = file.digest
+    save_state(state_file, state)
+    return True
+
+
+def wireguardcfgen(
+    systems: Optional[Iterable[System]] = None, *, dry_run_file: Optional[Path] = None
+) -> bool:
+    """Runs the WireGuard peer synchronization.
+
+    If a dry run file is given or configured, the peers are only
+    rendered to this file, which requires neither root privileges
+    nor the WireGuard kernel module.
+    If no systems are given, they are selected from the database.
+    """
+
+    if systems is None:
+        systems = System.select(cascade=True, relations=RELATIONS).where(True)
+
+    if (dry_run_file := dry_run_file or get_dry_run()) is not None:
+        return dry_run(dry_run_file, systems)
+
+    return syncconf(systems)
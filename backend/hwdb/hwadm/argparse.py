@@ -1,10 +1,13 @@
 """Command line argument parsing."""
 
-from argparse import _SubParsersAction, ArgumentParser, Namespace
+from argparse import _SubParsersAction, ArgumentParser, BooleanOptionalAction
+from argparse import Namespace
 from pathlib import Path
 from re import compile as Regex
 
+from hwdb.config import get_config
 from hwdb.enumerations import Connection, DeploymentType, OperatingSystem
+from hwdb.filter import PROBE_TIMEOUT, PROBE_WORKERS
 from hwdb.hooks import bind9cfgen, openvpncfgen
 from hwdb.parsers import connection
 from hwdb.parsers import customer
@@ -166,6 +169,57 @@ def _add_hooks_parser(subparsers: _SubParsersAction):
     )
 
 
+def _add_probe_parser(subparsers: _SubParsersAction):
+    """Adds a parser for recording the reachability of systems."""
+
+    parser = subparsers.add_parser("probe", help="record reachability of systems")
+    parser.add_argument("system", nargs="*", type=int, help="systems to probe")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=PROBE_WORKERS,
+        metavar="n",
+        help="amount of concurrent probes",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        default=PROBE_TIMEOUT,
+        metavar="seconds",
+        help="timeout of each probe",
+    )
+
+
+def _add_push_urls_parser(subparsers: _SubParsersAction):
+    """Adds a parser for pushing deployment URLs."""
+
+    parser = subparsers.add_parser("push-urls", help="push due deployment URLs")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        metavar="n",
+        help="amount of concurrent pushes",
+    )
+    parser.add_argument(
+        "-a",
+        "--attempts",
+        type=int,
+        metavar="n",
+        help="amount of attempts before a push fails",
+    )
+
+
+def _add_wireguard_parser(subparsers: _SubParsersAction):
+    """Adds a parser for configuring WireGuard on systems."""
+
+    parser = subparsers.add_parser("wireguard", help="configure WireGuard on a system")
+    parser.add_argument("system", type=system, help="the system to configure")
+    parser.add_argument("pubkey", nargs="?", help="the system's WireGuard public key")
+
+
 def _add_toggle_updating_parser(subparsers: _SubParsersAction):
     """Parses systems toggling actions."""
 
@@ -185,6 +239,13 @@ def get_args() -> Namespace:
         action="store_true",
         help="do not run post-transaction hooks",
     )
+    parser.add_argument(
+        "-d",
+        "--defer-hooks",
+        action=BooleanOptionalAction,
+        default=get_config().getboolean("hooks", "defer", fallback=False),
+        help="defer post-transaction hooks to the hwdb-hooks daemon",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="turn on verbose logging"
     )
@@ -193,5 +254,8 @@ def get_args() -> Namespace:
     _add_deploy_parser(subparsers)
     _add_dataset_parser(subparsers)
     _add_hooks_parser(subparsers)
+    _add_probe_parser(subparsers)
+    _add_push_urls_parser(subparsers)
     _add_toggle_updating_parser(subparsers)
+    _add_wireguard_parser(subparsers)
     return parser.parse_args()
@@ -1,17 +1,23 @@
 """Terminals adminstration."""
 
 from logging import DEBUG, INFO, basicConfig, getLogger
+from typing import Optional
 
 from hwdb.config import LOG_FORMAT
-from hwdb.hooks import bind9cfgen, openvpncfgen
+from hwdb.hooks import bind9cfgen, openvpncfgen, wireguardcfgen
+from hwdb.hooks.engine import run_hooks
 from hwdb.hwadm.argparse import get_args
 from hwdb.hwadm.deployment import add as add_deployment
 from hwdb.hwadm.deployment import batch_add as add_deployments
 from hwdb.hwadm.system import add as add_system
 from hwdb.hwadm.system import dataset
 from hwdb.hwadm.system import deploy
+from hwdb.hwadm.system import probe
 from hwdb.hwadm.system import toggle_updating
+from hwdb.hwadm.system import wireguard
+from hwdb.orm.system import System
 from hwdb.parsers import systems
+from hwdb.push import push_urls
 
 
 __all__ = ["main"]
@@ -22,6 +28,19 @@ LOGGER = getLogger("hwadm")
 TERMGR_USER = "termgr"
 
 
+def push(*, workers: Optional[int], max_attempts: Optional[int]) -> bool:
+    """Drains the URL outbox.
+    Pushes deferred for retry do not count as failure.
+    """
+
+    summary = push_urls(workers=workers, max_attempts=max_attempts)
+
+    if summary.due:
+        LOGGER.info("Pushed %i of %i due URLs.", summary.succeeded, summary.due)
+
+    return not summary.errors
+
+
 def main() -> int:
     """Runs the terminal administration CLI."""
 
@@ -36,14 +55,11 @@ def main() -> int:
         if args.target == "deps":
             success = add_deployments(args)
         elif args.target == "sys":
-            for _ in range(args.amount):
-                add_system(args)
-
-            success = True
+            success = add_system(args)
             hooks = (bind9cfgen, openvpncfgen)
     elif args.action == "deploy":
         deploy(args)
-        success = True
+        success = push(workers=None, max_attempts=None)
     elif args.action == "dataset":
         dataset(args)
         success = True
@@ -54,12 +70,35 @@ def main() -> int:
             LOGGER.error("Are you kidding me?")
         else:
             success = True
+    elif args.action == "probe":
+        probe(
+            systems(args.system, logger=LOGGER, strict=False)
+            if args.system
+            else System.select(cascade=True).where(True),
+            workers=args.workers,
+            timeout=args.timeout,
+        )
+        success = True
+    elif args.action == "push-urls":
+        success = push(workers=args.workers, max_attempts=args.attempts)
     elif args.action == "toggle-updating":
         toggle_updating(systems(args.system, logger=LOGGER, strict=False))
         success = True
+    elif args.action == "wireguard":
+        success = wireguard(args)
+        hooks = (bind9cfgen, wireguardcfgen)
+
+    if args.action != "run-hooks" and args.defer_hooks:
+        hooks = None  # Deferred to the hook runner via the change journal.
 
     if success and hooks and not args.no_hooks:
-        for hook in hooks:
-            hook()
+        for result in run_hooks(hooks):
+            LOGGER.info(
+                "Hook %s %s after %.2f seconds.",
+                result.name,
+                "succeeded" if result.success else "failed",
+                result.duration,
+            )
+            success &= result.success
 
     return 0 if success else 1
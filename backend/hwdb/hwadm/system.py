@@ -5,37 +5,41 @@ from logging import getLogger
 from typing import Iterable
 
 from hwdb.exceptions import TerminalConfigError
-from hwdb.orm.openvpn import OpenVPN
+from hwdb.filter import probe as probe_systems
+from hwdb.orm.reachability import Reachability
 from hwdb.orm.system import System
+from hwdb.reachability import get_reachability_cache
 
 
-__all__ = ["add", "dataset", "deploy", "toggle_updating"]
+__all__ = ["add", "dataset", "deploy", "probe", "toggle_updating", "wireguard"]
 
 
 LOGGER = getLogger("hwadm")
 
 
 def add(args: Namespace) -> bool:
-    """Adds a new system."""
+    """Adds new systems."""
 
     if args.key is not None:
         LOGGER.warning('Divergent OpenVPN key specified: "%s"!', args.key)
 
     try:
-        openvpn = OpenVPN.generate(key=args.key, mtu=args.mtu)
+        systems = System.provision(
+            args.amount,
+            group=args.group,
+            operating_system=args.operating_system,
+            serial_number=args.serial_number,
+            model=args.model,
+            key=args.key,
+            mtu=args.mtu,
+        )
     except TerminalConfigError as tce:
         LOGGER.error(tce)
         return False
 
-    system = System(
-        openvpn=openvpn,
-        group=args.group,
-        operating_system=args.operating_system,
-        serial_number=args.serial_number,
-        model=args.model,
-    )
-    system.save()
-    LOGGER.info("Added system: %i", system.id)
+    for system in systems:
+        LOGGER.info("Added system: %i", system.id)
+
     return True
 
 
@@ -107,6 +111,21 @@ def deploy(args: Namespace) -> None:
     LOGGER.info("System is currently deployed at: %s", args.system.deployment)
 
 
+def probe(systems: Iterable[System], *, workers: int, timeout: int) -> None:
+    """Probe the given systems and record their reachability."""
+
+    results = list(
+        probe_systems(systems, workers=workers, timeout=timeout, cache=False)
+    )
+    Reachability.store(results)
+    get_reachability_cache().store(results)
+    LOGGER.info(
+        "Recorded %i of %i systems as online.",
+        sum(result.online for result in results),
+        len(results),
+    )
+
+
 def toggle_updating(systems: Iterable[System]) -> None:
     """Toggle the updating flag on the given systems.."""
 
@@ -118,3 +137,16 @@ def toggle_updating(systems: Iterable[System]) -> None:
             system.id,
             "updating" if system.updating else "not updating",
         )
+
+
+def wireguard(args: Namespace) -> bool:
+    """Assigns a WireGuard address and public key to the system."""
+
+    try:
+        address = args.system.allocate_ipv6address(pubkey=args.pubkey)
+    except TerminalConfigError as tce:
+        LOGGER.error(tce)
+        return False
+
+    LOGGER.info("System #%i has WireGuard address %s.", args.system.id, address)
+    return True
@@ -1,7 +1,9 @@
 """Arguments parsing for termutil."""
 
 from argparse import _SubParsersAction, ArgumentParser, Namespace
+from pathlib import Path
 
+from hwdb.filter import PROBE_TIMEOUT, PROBE_WORKERS
 from hwdb.parsers import connection
 from hwdb.parsers import customer
 from hwdb.parsers import deployment
@@ -9,6 +11,8 @@ from hwdb.parsers import deployment_type
 from hwdb.parsers import group
 from hwdb.parsers import operating_system
 from hwdb.parsers import system
+from hwdb.screenshots import TIMEOUT as SCREENSHOT_TIMEOUT
+from hwdb.screenshots import WORKERS as SCREENSHOT_WORKERS
 from hwdb.tools.deployment import DEFAULT_FIELDS as DEPLOYMENT_FIELDS
 from hwdb.tools.deployment import DeploymentField
 from hwdb.tools.system import DEFAULT_FIELDS as SYSTEM_FIELDS
@@ -22,7 +26,7 @@ def _add_parser_list_systems(subparsers: _SubParsersAction):
     """Adds args to list systems."""
 
     parser = subparsers.add_parser("sys", help="list systems")
-    parser.set_defaults(deployed=None, configured=None, fitted=None)
+    parser.set_defaults(deployed=None, configured=None, fitted=None, online=None)
     parser.add_argument(
         "id",
         nargs="*",
@@ -110,6 +114,44 @@ def _add_parser_list_systems(subparsers: _SubParsersAction):
         dest="fitted",
         help="filter for not-fitted systems",
     )
+    parser.add_argument(
+        "--online", action="store_true", dest="online", help="filter for online systems"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_false",
+        dest="online",
+        help="filter for offline systems",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=PROBE_WORKERS,
+        metavar="n",
+        help="amount of concurrent online probes",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        default=PROBE_TIMEOUT,
+        metavar="seconds",
+        help="timeout of each online probe",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_false",
+        dest="cache",
+        help="bypass the reachability cache",
+    )
+    parser.add_argument(
+        "-m",
+        "--max-age",
+        type=int,
+        metavar="minutes",
+        help="filter by the recorded reachability instead of probing",
+    )
     parser.add_argument(
         "-f",
         "--fields",
@@ -225,6 +267,51 @@ def _add_parser_find(subparsers: _SubParsersAction):
     _add_parser_find_deployments(target)
 
 
+def _add_parser_screenshots(subparsers: _SubParsersAction):
+    """Adds a parser to collect screenshots."""
+
+    parser = subparsers.add_parser("screenshots", help="collect screenshots")
+    parser.add_argument(
+        "id",
+        nargs="*",
+        type=int,
+        metavar="id",
+        help="collect screenshots of the systems with the respective IDs",
+    )
+    parser.add_argument(
+        "-C",
+        "--customer",
+        nargs="+",
+        type=customer,
+        metavar="customer",
+        help="collect screenshots of the respective customers' systems",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        required=True,
+        metavar="path",
+        help="target directory or tar archive",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=SCREENSHOT_WORKERS,
+        metavar="n",
+        help="amount of concurrent downloads",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        default=SCREENSHOT_TIMEOUT,
+        metavar="seconds",
+        help="timeout of each download",
+    )
+
+
 def get_args() -> Namespace:
     """Returns the CLI options."""
 
@@ -235,5 +322,6 @@ def get_args() -> Namespace:
     subparsers = parser.add_subparsers(dest="action")
     _add_parser_list(subparsers)
     _add_parser_find(subparsers)
+    _add_parser_screenshots(subparsers)
     subparsers.add_parser("CSM-101", help="?")
     return parser.parse_args()
@@ -9,7 +9,8 @@ from peewee import ModelSelect
 from hwdb.exceptions import AmbiguityError, TerminalError
 from hwdb.filter import get_deployments
 from hwdb.tools.common import iter_print
-from hwdb.tools.deployment import get, listdep, printdep, DeploymentField
+from hwdb.tools.deployment import get, listdep, printdep, required_relations
+from hwdb.tools.deployment import DeploymentField
 
 
 __all__ = ["find", "list"]
@@ -29,6 +30,7 @@ def _get_deployments(args: Namespace) -> ModelSelect:
         connections=args.connection,
         systems=args.system,
         sort=True,
+        relations=required_relations(args.fields),
     )
 
 
@@ -10,6 +10,7 @@ from hwdb.hwutil.deployment import find as find_deployment
 from hwdb.hwutil.deployment import list as list_deployments
 from hwdb.hwutil.system import find as find_system
 from hwdb.hwutil.system import list as list_systems
+from hwdb.hwutil.system import screenshots
 
 
 __all__ = ["main"]
@@ -42,6 +43,8 @@ def main() -> int:
             success = find_system(args)
         elif args.target == "dep":
             success = find_deployment(args)
+    elif args.action == "screenshots":
+        success = screenshots(args)
     elif args.action == "CSM-101":
         print(ARNIE)
         success = True
@@ -1,17 +1,19 @@
 """System related actions."""
 
 from argparse import Namespace
+from datetime import timedelta
 from logging import getLogger
 from typing import Iterator
 
 from hwdb.exceptions import AmbiguityError, TerminalError
 from hwdb.filter import get_systems
 from hwdb.orm.system import System
+from hwdb.screenshots import collect_screenshots
 from hwdb.tools.common import iter_print
-from hwdb.tools.system import get, listsys, printsys, SystemField
+from hwdb.tools.system import get, listsys, printsys, required_relations, SystemField
 
 
-__all__ = ["find", "list"]
+__all__ = ["find", "list", "screenshots"]
 
 
 LOGGER = getLogger("hwutil")
@@ -30,7 +32,13 @@ def _get_systems(args: Namespace) -> Iterator[System]:
         fitted=args.fitted,
         operating_systems=args.operating_system,
         groups=args.group,
+        online=args.online,
         sort=True,
+        workers=args.workers,
+        timeout=args.timeout,
+        cache=args.cache,
+        max_age=None if args.max_age is None else timedelta(minutes=args.max_age),
+        relations=required_relations(args.fields),
     )
 
 
@@ -63,3 +71,19 @@ def list(args: Namespace) -> bool:
         return iter_print(field.value for field in SystemField)
 
     return iter_print(listsys(_get_systems(args), fields=args.fields))
+
+
+def screenshots(args: Namespace) -> bool:
+    """Collects screenshots of the selected systems."""
+
+    manifest = collect_screenshots(
+        get_systems(ids=args.id, customers=args.customer, relations={"openvpn"}),
+        args.output,
+        workers=args.workers,
+        timeout=args.timeout,
+    )
+    failed = sum(1 for entry in manifest if entry["error"] is not None)
+    LOGGER.info(
+        "Collected %i of %i screenshots.", len(manifest) - failed, len(manifest)
+    )
+    return not failed
@@ -0,0 +1,248 @@
+"""In-process ICMP echo prober using unprivileged datagram sockets."""
+
+from __future__ import annotations
+from ipaddress import ip_address
+from itertools import count as counter
+from selectors import EVENT_READ, DefaultSelector
+from socket import AF_INET, AF_INET6, IPPROTO_ICMP, IPPROTO_ICMPV6, SOCK_DGRAM
+from socket import SOL_SOCKET, SO_RCVBUF, socket
+from struct import Struct
+from time import monotonic
+from typing import Iterable, Iterator, Optional
+
+from hwdb.types import IPAddress
+
+
+__all__ = ["Prober", "ping"]
+
+
+ECHO_REQUEST = {4: 8, 6: 128}
+ECHO_REPLY = {4: 0, 6: 129}
+FAMILIES = {4: (AF_INET, IPPROTO_ICMP, "0.0.0.0"), 6: (AF_INET6, IPPROTO_ICMPV6, "::")}
+HEADER = Struct("!BBHHH")
+PAYLOAD = b"hwdb-icmp-prober" * 3
+RECEIVE_BUFFER = 4 * 1024 * 1024
+REPLY_TIMEOUT = 1.0
+SEND_BATCH = 64
+
+
+def checksum(data: bytes) -> int:
+    """Returns the internet checksum of the given data."""
+
+    if len(data) % 2:
+        data += b"\0"
+
+    total = sum(Struct(f"!{len(data) // 2}H").unpack(data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def open_socket(version: int) -> socket:
+    """Opens an unprivileged ICMP datagram socket.
+    Raises OSError if the kernel does not permit it.
+    """
+
+    family, protocol, any_address = FAMILIES[version]
+    sock = socket(family, SOCK_DGRAM, protocol)
+
+    try:
+        sock.setsockopt(SOL_SOCKET, SO_RCVBUF, RECEIVE_BUFFER)
+        sock.bind((any_address, 0))
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+
+    return sock
+
+
+class Prober:
+    """Sends ICMP echo requests to many targets from one event loop."""
+
+    def __init__(
+        self,
+        *,
+        count: int = 3,
+        interval: float = 1.0,
+        timeout: Optional[float] = None,
+    ):
+        """Sets the amount of echo requests per target, the interval
+        between the request rounds and an overall deadline in seconds.
+        """
+        self.count = count
+        self.interval = interval
+        self.timeout = timeout
+
+    @property
+    def deadline(self) -> float:
+        """Returns the overall probing time in seconds."""
+        if self.timeout is not None:
+            return self.timeout
+
+        return (self.count - 1) * self.interval + REPLY_TIMEOUT
+
+    def probe(
+        self, addresses: Iterable[IPAddress]
+    ) -> Iterator[tuple[IPAddress, Optional[float]]]:
+        """Probes the given addresses.
+
+        Yields tuples of the address and its round trip time in seconds as
+        soon as the first reply of the respective target arrives. Targets
+        that did not reply before the deadline are yielded with None.
+        The sockets are opened eagerly, so that an OSError is raised
+        by this method if unprivileged ICMP sockets are not available.
+        """
+        targets = set(addresses)
+        sockets = {}
+
+        try:
+            for version in {address.version for address in targets}:
+                sockets[version] = open_socket(version)
+        except OSError:
+            for sock in sockets.values():
+                sock.close()
+
+            raise
+
+        return self._run(sockets, targets)
+
+    def _run(
+        self, sockets: dict[int, socket], targets: set[IPAddress]
+    ) -> Iterator[tuple[IPAddress, Optional[float]]]:
+        """Runs the event loop."""
+        selector = DefaultSelector()
+        identifiers = {}
+        sequences = counter()
+        pending = {}
+        start = monotonic()
+        deadline = start + self.deadline
+
+        for version, sock in sockets.items():
+            identifiers[version] = sock.getsockname()[1] & 0xFFFF
+            selector.register(sock, EVENT_READ, version)
+
+        try:
+            for round_ in range(self.count):
+                for index, address in enumerate(list(targets), start=1):
+                    if address not in targets:
+                        continue  # Answered while sending this round.
+
+                    sequence = next(sequences) & 0xFFFF
+                    version = address.version
+                    packet = self._packet(version, identifiers[version], sequence)
+
+                    try:
+                        sockets[version].sendto(packet, (str(address), 0))
+                    except OSError:
+                        continue  # Send buffer full or unreachable. Retry later.
+
+                    pending[(address, sequence)] = monotonic()
+
+                    if index % SEND_BATCH == 0:  # Drain replies while sending.
+                        yield from self._receive(
+                            selector, identifiers, pending, targets, None
+                        )
+
+                until = min(start + (round_ + 1) * self.interval, deadline)
+
+                if round_ == self.count - 1:
+                    until = deadline
+
+                yield from self._receive(selector, identifiers, pending, targets, until)
+
+                if not targets or monotonic() >= deadline:
+                    break
+        finally:
+            selector.close()
+
+            for sock in sockets.values():
+                sock.close()
+
+        for address in targets:
+            yield address, None
+
+    def _receive(
+        self,
+        selector: DefaultSelector,
+        identifiers: dict[int, int],
+        pending: dict[tuple[IPAddress, int], float],
+        targets: set[IPAddress],
+        until: Optional[float],
+    ) -> Iterator[tuple[IPAddress, float]]:
+        """Receives echo replies until the given point in time.
+        If until is None, only receives the replies already available.
+        """
+        while targets:
+            if until is None:
+                timeout = 0
+            elif (timeout := until - monotonic()) <= 0:
+                break
+
+            for key, _ in selector.select(timeout):
+                version = key.data
+
+                while True:
+                    try:
+                        data, (host, *_) = key.fileobj.recvfrom(2048)
+                    except BlockingIOError:
+                        break
+
+                    if len(data) < HEADER.size:
+                        continue
+
+                    type_, _, _, identifier, sequence = HEADER.unpack_from(data)
+
+                    if type_ != ECHO_REPLY[version]:
+                        continue
+
+                    if identifier != identifiers[version]:
+                        continue
+
+                    address = ip_address(host.split("%")[0])
+
+                    if (sent := pending.pop((address, sequence), None)) is None:
+                        continue
+
+                    if address in targets:
+                        targets.discard(address)
+                        yield address, monotonic() - sent
+
+            if until is None:
+                break
+
+    @staticmethod
+    def _packet(version: int, identifier: int, sequence: int) -> bytes:
+        """Returns an echo request packet."""
+        header = HEADER.pack(ECHO_REQUEST[version], 0, 0, identifier, sequence)
+
+        if version == 6:  # The kernel computes the ICMPv6 checksum.
+            return header + PAYLOAD
+
+        header = HEADER.pack(
+            ECHO_REQUEST[version],
+            0,
+            checksum(header + PAYLOAD),
+            identifier,
+            sequence,
+        )
+        return header + PAYLOAD
+
+
+def ping(
+    address: IPAddress,
+    *,
+    count: int = 3,
+    interval: float = 1.0,
+    timeout: Optional[float] = None,
+) -> Optional[float]:
+    """Pings a single address.
+    Returns the round trip time in seconds or None if it did not reply.
+    """
+
+    prober = Prober(count=count, interval=interval, timeout=timeout)
+
+    for _, rtt in prober.probe([address]):
+        return rtt
+
+    return None
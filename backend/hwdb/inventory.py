@@ -0,0 +1,114 @@
+"""Dynamic ansible inventory."""
+
+from argparse import ArgumentParser, Namespace
+from datetime import timedelta
+from json import dumps
+from pathlib import Path
+from time import time
+from typing import Optional
+
+from peewee import fn
+
+from hwdb.ansible import BLOCK_SIZE
+from hwdb.config import LOGGER, get_config
+from hwdb.hooks.common import load_state, save_state
+from hwdb.orm.journal import Change
+from hwdb.orm.reachability import Reachability
+from hwdb.orm.system import System
+
+
+__all__ = ["get_inventory", "main"]
+
+
+CACHE_FILE = "/var/cache/hwdb/inventory.json"
+CACHE_TTL = 3600
+REACHABILITY_MAX_AGE = 3600
+
+
+def get_journal_position() -> Optional[int]:
+    """Returns the ID of the last journaled change."""
+
+    return Change.select(fn.MAX(Change.id)).scalar()
+
+
+def load_cache(path: Path) -> Optional[dict]:
+    """Returns the cached inventory or None if the cache is unreadable."""
+
+    try:
+        cache = load_state(path)
+    except (OSError, ValueError) as error:
+        LOGGER.warning("Ignoring unreadable inventory cache: %s", error)
+        return None
+
+    if not isinstance(cache, dict) or "inventory" not in cache:
+        return None
+
+    return cache
+
+
+def get_inventory(*, refresh: bool = False) -> dict:
+    """Returns the inventory from the cache file, unless changes were
+    journaled or the cache expired since it was written.
+    Changes that bypass the journal, such as bulk updates,
+    are picked up once the cache expired.
+    """
+
+    config = get_config()
+    path = Path(config.get("ansible", "cache_file", fallback=CACHE_FILE))
+    ttl = config.getfloat("ansible", "cache_ttl", fallback=CACHE_TTL)
+    max_age = timedelta(
+        seconds=config.getfloat(
+            "ansible", "reachability_max_age", fallback=REACHABILITY_MAX_AGE
+        )
+    )
+    position = get_journal_position()
+
+    if (
+        not refresh
+        and (cache := load_cache(path)) is not None
+        and cache.get("journal") == position
+        and time() - cache.get("timestamp", 0) <= ttl
+    ):
+        return cache["inventory"]
+
+    inventory = System.ansible_inventory(
+        block_size=config.getint("ansible", "block_size", fallback=BLOCK_SIZE),
+        path_limit=config.getint("ansible", "path_limit", fallback=None),
+        reachability=Reachability.by_system(max_age),
+    )
+
+    try:
+        save_state(
+            path, {"journal": position, "timestamp": time(), "inventory": inventory}
+        )
+    except OSError as error:
+        LOGGER.warning("Could not cache inventory: %s", error)
+
+    return inventory
+
+
+def get_args() -> Namespace:
+    """Parses the command line arguments."""
+
+    parser = ArgumentParser(description="Dynamic ansible inventory.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--list", action="store_true", help="list the inventory")
+    group.add_argument("--host", metavar="host", help="list the host's variables")
+    parser.add_argument(
+        "-r", "--refresh", action="store_true", help="ignore the cached inventory"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Prints the inventory as JSON."""
+
+    args = get_args()
+    inventory = get_inventory(refresh=args.refresh)
+
+    if args.list:
+        print(dumps(inventory))
+    else:
+        print(dumps(inventory["_meta"]["hostvars"].get(args.host, {})))
+
+    return 0
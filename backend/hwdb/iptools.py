@@ -1,6 +1,5 @@
 """Tools for IPv4 address pools handling."""
 
-from contextlib import suppress
 from ipaddress import IPv4Address
 from typing import Iterator
 
@@ -10,7 +9,35 @@ from hwdb.exceptions import TerminalConfigError
 from hwdb.types import IPAddress, IPAddresses, IPNetwork
 
 
-__all__ = ["get_address", "used_ipv4addresses"]
+__all__ = ["free_addresses", "get_address", "used_ipv4addresses"]
+
+
+def free_addresses(
+    network: IPNetwork, used: IPAddresses = (), reserved: IPAddresses = ()
+) -> Iterator[IPAddress]:
+    """Yields the free addresses of the network in ascending order.
+
+    Walks the gaps in the sorted blacklisted addresses, so that the cost
+    depends on the amount of used addresses, not on the network size.
+    """
+
+    address_type = type(network.network_address)
+    candidate = int(network.network_address)
+    blacklist = sorted(
+        int(address) for address in {*used, *reserved} if address in network
+    )
+
+    for address in blacklist:
+        while candidate < address:
+            yield address_type(candidate)
+            candidate += 1
+
+        if address == candidate:
+            candidate += 1
+
+    while candidate <= int(network.broadcast_address):
+        yield address_type(candidate)
+        candidate += 1
 
 
 def get_address(
@@ -20,11 +47,8 @@ def get_address(
     XXX: Beware of race conditions!
     """
 
-    blacklist = set(used) | set(reserved)
-
-    for address in network:
-        if address not in blacklist:
-            return address
+    for address in free_addresses(network, used=used, reserved=reserved):
+        return address
 
     raise TerminalConfigError("Network exhausted!")
 
@@ -32,6 +56,5 @@ def get_address(
 def used_ipv4addresses(model: ModelBase) -> Iterator[IPv4Address]:
     """Yields all used IPv4 addresses."""
 
-    for record in model:
-        with suppress(AttributeError):
-            yield record.ipv4address
+    for (ipv4address,) in model.select(model.ipv4address).tuples():
+        yield ipv4address
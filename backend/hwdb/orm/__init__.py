@@ -4,27 +4,44 @@ from hwdb.orm.deployment import Deployment, DeploymentTemp
 from hwdb.orm.display import Display
 from hwdb.orm.generic import GenericHardware
 from hwdb.orm.group import Group
+from hwdb.orm.journal import Change
 from hwdb.orm.openvpn import OpenVPN
+from hwdb.orm.reachability import Reachability
 from hwdb.orm.smart_tv import SmartTV
 from hwdb.orm.system import System, get_free_ipv6_address
+from hwdb.orm.url_push import URLPush
 
 
 __all__ = [
     "MODELS",
     "create_tables",
     "get_free_ipv6_address",
+    "Change",
     "Deployment",
     "DeploymentTemp",
     "Display",
     "GenericHardware",
     "Group",
     "OpenVPN",
+    "Reachability",
     "SmartTV",
     "System",
+    "URLPush",
 ]
 
 
-MODELS = (Group, Deployment, SmartTV, OpenVPN, System, Display, GenericHardware)
+MODELS = (
+    Group,
+    Deployment,
+    SmartTV,
+    OpenVPN,
+    System,
+    Reachability,
+    Display,
+    GenericHardware,
+    Change,
+    URLPush,
+)
 
 
 def create_tables(models=MODELS):
@@ -1,12 +1,24 @@
 """Common ORM models."""
 
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterable, Iterator
+
+from peewee import IntegrityError
+
 from peeweeplus import JSONModel, MySQLDatabaseProxy
 
+from hwdb.config import LOGGER
+from hwdb.exceptions import TerminalConfigError
+
 
-__all__ = ["DATABASE", "BaseModel"]
+__all__ = ["DATABASE", "BaseModel", "advisory_lock", "allocating", "is_collision"]
 
 
 DATABASE = MySQLDatabaseProxy("hwdb")
+DUPLICATE_ENTRY = 1062  # MySQL error code of unique key violations.
+LOCK_TIMEOUT = 30
+RETRIES = 5
 
 
 class BaseModel(JSONModel):  # pylint: disable=R0903
@@ -15,3 +27,83 @@ class BaseModel(JSONModel):  # pylint: disable=R0903
     class Meta:  # pylint: disable=C0111,R0903
         database = DATABASE
         schema = database.database
+
+
+@contextmanager
+def advisory_lock(name: str, *, timeout: int = LOCK_TIMEOUT) -> Iterator[None]:
+    """Holds the named advisory lock of the database server."""
+
+    cursor = DATABASE.execute_sql("SELECT GET_LOCK(%s, %s)", (name, timeout))
+
+    if not cursor.fetchone()[0]:
+        raise TerminalConfigError(f"Could not acquire lock {name}.")
+
+    try:
+        yield
+    finally:
+        DATABASE.execute_sql("SELECT RELEASE_LOCK(%s)", (name,))
+
+
+def is_collision(error: IntegrityError, columns: Iterable[str]) -> bool:
+    """Checks whether the error is a violation
+    of the unique key of any of the given columns.
+    """
+
+    code, message, *_ = (*error.args, None, None)
+
+    if code != DUPLICATE_ENTRY or not isinstance(message, str):
+        return False
+
+    # MySQL >= 8.0.19 qualifies the key name with the table name.
+    key = message.rpartition(" for key ")[2].strip("'").rpartition(".")[2]
+    return any(key == column or key.endswith(f"_{column}") for column in columns)
+
+
+def allocating(
+    lock: str, columns: Iterable[str], *, retries: int = RETRIES
+) -> Callable:
+    """Decorates a function that allocates unique addresses
+    stored in the given columns.
+
+    The function runs in a transaction, which is committed before the
+    advisory lock is released, so that concurrent allocators see the
+    addresses taken. Hence it must not be called within an open
+    transaction, where the commit would happen after the release.
+    Writers not using the lock are detected by the unique keys of the
+    columns, in which case the function is retried.
+    Other integrity errors are raised.
+    """
+
+    columns = frozenset(columns)
+
+    def decorator(function: Callable) -> Callable:
+        """Decorates the function."""
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            """Wraps the original function."""
+            if DATABASE.in_transaction():
+                raise TerminalConfigError(
+                    f"Cannot allocate addresses within a transaction: {lock}"
+                )
+
+            for attempt in range(1, retries + 1):
+                try:
+                    with advisory_lock(lock), DATABASE.atomic():
+                        return function(*args, **kwargs)
+                except IntegrityError as error:
+                    if not is_collision(error, columns):
+                        raise
+
+                    LOGGER.warning(
+                        "Address collision on attempt %i/%i: %s",
+                        attempt,
+                        retries,
+                        error,
+                    )
+
+            raise TerminalConfigError("Could not allocate a free address.")
+
+        return wrapper
+
+    return decorator
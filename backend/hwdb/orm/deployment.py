@@ -1,6 +1,7 @@
 """Terminal deployments."""
 
 from datetime import datetime
+from typing import Iterable
 from xml.etree.ElementTree import Element, SubElement
 
 from peewee import JOIN
@@ -27,15 +28,17 @@ from peeweeplus import EnumField, HTMLTextField
 
 from hwdb.enumerations import Connection, DeploymentType
 from hwdb.orm.common import BaseModel
+from hwdb.orm.journal import Change
 from configlib import load_config
 
-__all__ = ["Deployment", "DeploymentTemp"]
+__all__ = ["RELATIONS", "Deployment", "DeploymentTemp"]
 
 backend = default_backend()
 iterations = 100_000
 
 
 HTML_HEADERS = ("ID", "Customer", "Type", "Address")
+RELATIONS = frozenset({"customer", "address", "lpt_address", "systems"})
 
 
 def _derive_key(password: bytes, salt: bytes, iterations: int = iterations) -> bytes:
@@ -96,31 +99,68 @@ class Deployment(BaseModel):
 
         return f"{string} ({self.annotation})"
 
+    def save(self, *args, **kwargs) -> int:
+        """Saves the deployment and journals the change."""
+        created = self.id is None
+        fields = {field.name for field in self.dirty_fields}
+        result = super().save(*args, **kwargs)
+
+        if created or fields:
+            Change.add(self, fields=None if created else fields)
+
+        return result
+
+    def delete_instance(self, *args, **kwargs) -> int:
+        """Deletes the deployment and journals the change."""
+        Change.add(self)
+        return super().delete_instance(*args, **kwargs)
+
     @classmethod
-    def select(cls, *args, cascade: bool = False) -> Select:
-        """Selects deployments."""
+    def select(
+        cls, *args, cascade: bool = False, relations: Iterable[str] = RELATIONS
+    ) -> Select:
+        """Selects deployments.
+        If cascading, only the given relations are joined.
+        """
         if not cascade:
             return super().select(*args)
 
+        relations = frozenset(relations)
         lpt_address = Address.alias()
         system = cls.systems.rel_model
-        return (
-            super()
-            .select(cls, Customer, Company, Address, lpt_address, *args)
-            .join(Customer)
-            .join(Company)
-            .join_from(cls, Address, on=cls.address == Address.id)
-            .join_from(
+        models = [cls]
+
+        if "customer" in relations:
+            models += [Customer, Company]
+
+        if "address" in relations:
+            models.append(Address)
+
+        if "lpt_address" in relations:
+            models.append(lpt_address)
+
+        select = super().select(*models, *args)
+
+        if "customer" in relations:
+            select = select.join_from(cls, Customer).join(Company)
+
+        if "address" in relations:
+            select = select.join_from(cls, Address, on=cls.address == Address.id)
+
+        if "lpt_address" in relations:
+            select = select.join_from(
                 cls,
                 lpt_address,
                 on=cls.lpt_address == lpt_address.id,
                 join_type=JOIN.LEFT_OUTER,
             )
-            .join_from(
+
+        if "systems" in relations:
+            select = select.join_from(
                 cls, system, on=system.deployment == cls.id, join_type=JOIN.LEFT_OUTER
-            )
-            .distinct()
-        )
+            ).distinct()
+
+        return select
 
     @property
     def prepared(self) -> bool:
@@ -0,0 +1,105 @@
+"""Journal of changes relevant to post-transaction hooks."""
+
+from __future__ import annotations
+from datetime import datetime
+from typing import Iterable, Optional
+
+from peewee import CharField
+from peewee import DateTimeField
+from peewee import IntegerField
+from peewee import Model
+from peewee import Select
+
+from hwdb.orm.common import BaseModel
+
+
+__all__ = ["Change"]
+
+
+WILDCARD = "*"  # Record was created or deleted.
+
+
+class Change(BaseModel):
+    """A journaled change of a record."""
+
+    class Meta:  # pylint: disable=C0115,R0903
+        table_name = "change_journal"
+
+    timestamp = DateTimeField(default=datetime.now, index=True)
+    model = CharField(32)  # Table name of the changed record.
+    ident = IntegerField(null=True)  # ID of the changed record.
+    system = IntegerField(null=True, index=True)  # ID of the affected system.
+    fields = CharField(255, default=WILDCARD)  # Comma-separated field names.
+    processed = DateTimeField(null=True, index=True)
+
+    @classmethod
+    def add(
+        cls,
+        record: Model,
+        *,
+        system: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Change:
+        """Journals a change of the given record.
+        If fields is None, the record was created or deleted.
+        """
+        change = cls(
+            model=record._meta.table_name,
+            ident=record.id,
+            system=system,
+            fields=WILDCARD if fields is None else ",".join(sorted(fields)),
+        )
+        change.save()
+        return change
+
+    @classmethod
+    def add_many(
+        cls,
+        model: type[Model],
+        idents: Iterable[int],
+        *,
+        systems: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> None:
+        """Journals changes of multiple records of the given model.
+        If fields is None, the records were created.
+        If systems is True, the records are systems.
+        """
+        fields = WILDCARD if fields is None else ",".join(sorted(fields))
+        cls.insert_many(
+            [
+                {
+                    "model": model._meta.table_name,
+                    "ident": ident,
+                    "system": ident if systems else None,
+                    "fields": fields,
+                }
+                for ident in idents
+            ]
+        ).execute()
+
+    @classmethod
+    def pending(cls) -> Select:
+        """Selects unprocessed changes."""
+        return cls.select().where(cls.processed >> None).order_by(cls.id)
+
+    @classmethod
+    def prune(cls, before: datetime) -> int:
+        """Deletes changes processed before the given time.
+        Returns the amount of deleted changes.
+        """
+        return cls.delete().where(cls.processed < before).execute()
+
+    @property
+    def changed_fields(self) -> set[str]:
+        """Returns the changed fields qualified by the table name."""
+        return {f"{self.model}.{field}" for field in self.fields.split(",")}
+
+    def triggers(self, triggers: Iterable[str]) -> bool:
+        """Checks whether the change affects any of the given table-qualified
+        fields. Creations and deletions affect all fields of the table.
+        """
+        if self.fields == WILDCARD:
+            return any(trigger.startswith(f"{self.model}.") for trigger in triggers)
+
+        return not self.changed_fields.isdisjoint(triggers)
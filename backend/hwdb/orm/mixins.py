@@ -3,12 +3,11 @@
 from typing import Iterator, Optional, Union
 
 from peewee import Expression, Select
-from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
 
-from hwdb.config import LOGGER, get_config
+from hwdb.config import get_config
 from hwdb.orm.deployment import Deployment
+from hwdb.orm.journal import Change
 from hwdb.types import DeploymentChange
-from hwdb.exceptions import SystemOffline
 
 __all__ = ["DeployingMixin", "DNSMixin", "MonitoringMixin"]
 
@@ -23,17 +22,25 @@ class DeployingMixin:
     def undeploy_all(
         cls, deployment: Deployment, *, exclude: Optional[Union["System", int]] = None
     ) -> Iterator[DeploymentChange]:
-        """Undeploy other systems."""
+        """Undeploy other systems in one bulk update."""
         condition = cls.deployment == deployment
 
         if exclude is not None:
             condition &= cls.id != exclude
 
-        for system in cls.select().where(condition):
+        systems = list(cls.select().where(condition))
+
+        if not systems:
+            return
+
+        ids = [system.id for system in systems]
+        cls.update(fitted=False, deployment=None).where(cls.id << ids).execute()
+        Change.add_many(cls, ids, systems=True, fields={"deployment", "fitted"})
+
+        for system in systems:
             system.fitted = False
             system.deployment = None
-            system.save()
-            yield DeploymentChange(system, system.deployment, None)
+            yield DeploymentChange(system, deployment, None)
 
     def change_deployment(
         self, deployment: Optional[Deployment]
@@ -42,15 +49,6 @@ class DeployingMixin:
         if deployment == self.deployment:
             return None
 
-        if deployment is not None and deployment.url is not None:
-            try:
-                response = self.apply_url(deployment.url)
-            except (ConnectionError, ChunkedEncodingError, Timeout, SystemOffline):
-                LOGGER.warning("System is offline.")
-            else:
-                if response.status_code != 200:
-                    LOGGER.warning("Could not set URL on system.")
-
         self.deployment, old = deployment, self.deployment
         return DeploymentChange(self, old, deployment)
 
@@ -61,13 +59,22 @@ class DeployingMixin:
         exclusive: bool = False,
         fitted: bool = False,
     ) -> Iterator[DeploymentChange]:
-        """Locates a system at the respective deployment."""
+        """Locates a system at the respective deployment.
+        The deployment's URL is enqueued along with the system's change.
+        The outbox is drained concurrently by push_urls().
+        """
         if exclusive and deployment is not None:
             yield from type(self).undeploy_all(deployment, exclude=self)
 
         if (change := self.change_deployment(deployment)) is not None:
             self.fitted = fitted and (deployment is not None)
-            self.save()
+
+            with self._meta.database.atomic():
+                self.save()
+
+                if deployment is not None and deployment.url is not None:
+                    type(self).url_pushes.rel_model.enqueue(self, deployment.url)
+
             yield change
 
 
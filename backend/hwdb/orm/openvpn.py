@@ -1,31 +1,38 @@
 """OpenVPN connections."""
 
 from __future__ import annotations
+from ipaddress import IPv4Address
+from typing import Iterator, Optional
 
+from peewee import JOIN
+from peewee import SQL
 from peewee import CharField
 from peewee import IntegerField
+from peewee import fn
 
 from peeweeplus import IPv4AddressField
 
 from hwdb.config import get_openvpn_network
-from hwdb.iptools import get_address, used_ipv4addresses
-from hwdb.orm.common import BaseModel
-from hwdb.types import IPAddress, IPNetwork
+from hwdb.exceptions import TerminalConfigError
+from hwdb.orm.common import BaseModel, allocating
+from hwdb.orm.journal import Change
+from hwdb.types import IPNetwork
 
 
-__all__ = ["OpenVPN"]
+__all__ = ["COLUMNS", "LOCK", "OpenVPN"]
 
 
-def get_reserved_addresses(openvpn_network: IPNetwork) -> set[IPAddress]:
-    """Returns reserved addresses."""
+COLUMNS = frozenset({"ipv4address"})  # Columns holding allocated addresses.
+LOCK = "hwdb.openvpn"
 
-    return {addr for index, addr in enumerate(openvpn_network) if index <= 10}
+
+RESERVED = 11  # Amount of reserved addresses at the start of the network.
 
 
 class OpenVPN(BaseModel):
     """OpenVPN settings."""
 
-    ipv4address = IPv4AddressField()
+    ipv4address = IPv4AddressField(unique=True)
     key = CharField(36, null=True)
     mtu = IntegerField(null=True)
 
@@ -33,18 +40,126 @@ class OpenVPN(BaseModel):
         """Returns a human-readable representation."""
         return str(self.ipv4address)
 
+    def save(self, *args, **kwargs) -> int:
+        """Saves the record and journals the change."""
+        created = self.id is None
+        fields = {field.name for field in self.dirty_fields}
+        result = super().save(*args, **kwargs)
+
+        if created or fields:
+            Change.add(self, fields=None if created else fields)
+
+        return result
+
+    @classmethod
+    def gaps(
+        cls, first: IPv4Address, last: IPv4Address, *, limit: Optional[int] = None
+    ) -> Iterator[tuple[int, int]]:
+        """Yields the first and last address of up to limit gaps
+        between used addresses from first to last in ascending order.
+
+        The gaps are found by the database using the index on the
+        address column, so that only the gaps are transferred.
+        """
+        first, last = int(first), int(last)
+
+        if (lowest := cls.lowest_used(first)) is None:
+            yield first, last
+            return
+
+        if (lowest := int(lowest)) > first:
+            yield first, min(lowest - 1, last)
+
+        successor = cls.alias()
+        following = cls.alias()
+        candidate = cls.ipv4address + SQL("1")
+        select = (
+            cls.select(
+                candidate,
+                following.select(fn.MIN(following.ipv4address)).where(
+                    following.ipv4address > cls.ipv4address
+                ),
+            )
+            .join(
+                successor,
+                join_type=JOIN.LEFT_OUTER,
+                on=successor.ipv4address == candidate,
+            )
+            .where(
+                (successor.id >> None)
+                & (cls.ipv4address >= IPv4Address(first))
+                & (cls.ipv4address < IPv4Address(last))
+            )
+            .order_by(cls.ipv4address)
+            .limit(limit)
+        )
+
+        for start, end in select.tuples():
+            yield int(start), (last if end is None else min(int(end) - 1, last))
+
+    @classmethod
+    def lowest_used(cls, first: int) -> Optional[IPv4Address]:
+        """Returns the lowest used address not below first."""
+        return (
+            cls.select(cls.ipv4address)
+            .where(cls.ipv4address >= IPv4Address(first))
+            .order_by(cls.ipv4address)
+            .limit(1)
+            .scalar()
+        )
+
+    @classmethod
+    def free_ipv4addresses(
+        cls, amount: int, network: IPNetwork = None
+    ) -> list[IPv4Address]:
+        """Returns the given amount of free non-reserved addresses
+        of the network in ascending order.
+        Callers must hold the advisory lock to prevent race conditions.
+        """
+        network = network or get_openvpn_network()
+        addresses = []
+
+        for start, end in cls.gaps(network[RESERVED], network[-1], limit=amount):
+            missing = amount - len(addresses)
+            addresses.extend(
+                map(IPv4Address, range(start, min(end, start + missing - 1) + 1))
+            )
+
+            if len(addresses) == amount:
+                return addresses
+
+        raise TerminalConfigError("Network exhausted!")
+
     @classmethod
+    def free_ipv4address(cls, network: IPNetwork = None) -> IPv4Address:
+        """Returns the first free non-reserved address of the network.
+        Callers must hold the advisory lock to prevent race conditions.
+        """
+        return cls.free_ipv4addresses(1, network)[0]
+
+    @classmethod
+    @allocating(LOCK, COLUMNS)
     def generate(cls, key: str = None, mtu: int = None) -> OpenVPN:
         """Adds a record for the terminal."""
-        ipv4address = get_address(
-            openvpn_network := get_openvpn_network(),
-            used=used_ipv4addresses(cls),
-            reserved=get_reserved_addresses(openvpn_network),
-        )
-        record = cls(ipv4address=ipv4address, key=key, mtu=mtu)
+        record = cls(ipv4address=cls.free_ipv4address(), key=key, mtu=mtu)
         record.save()
         return record
 
+    @classmethod
+    def allocate_many(
+        cls, amount: int, *, key: str = None, mtu: int = None
+    ) -> list[OpenVPN]:
+        """Adds the given amount of records in one batch.
+        Callers must hold the advisory lock to prevent race conditions.
+        """
+        addresses = cls.free_ipv4addresses(amount)
+        cls.insert_many(
+            [{"ipv4address": address, "key": key, "mtu": mtu} for address in addresses]
+        ).execute()
+        return list(
+            cls.select().where(cls.ipv4address << addresses).order_by(cls.ipv4address)
+        )
+
     @property
     def filename(self) -> str:
         """Returns the CCD file name."""
@@ -0,0 +1,89 @@
+"""Recorded system reachability."""
+
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from peewee import BooleanField
+from peewee import DateTimeField
+from peewee import Expression
+from peewee import FloatField
+from peewee import ForeignKeyField
+from peewee import chunked
+
+from hwdb.orm.common import BaseModel
+from hwdb.orm.system import System
+from hwdb.types import ProbeResult
+
+
+__all__ = ["Reachability"]
+
+
+BATCH_SIZE = 1000
+
+
+class Reachability(BaseModel):
+    """The last probe result of a system."""
+
+    system = ForeignKeyField(
+        System,
+        column_name="system",
+        unique=True,
+        backref="reachability",
+        on_delete="CASCADE",
+        on_update="CASCADE",
+        lazy_load=False,
+    )
+    timestamp = DateTimeField(default=datetime.now, index=True)
+    online = BooleanField()
+    rtt = FloatField(null=True)  # Round trip time in seconds.
+
+    @classmethod
+    def condition(cls, online: bool, max_age: Optional[timedelta] = None) -> Expression:
+        """Returns the condition for systems recorded as online or offline
+        by a probe not older than max_age.
+        """
+        condition = cls.online == online
+
+        if max_age is not None:
+            condition &= cls.timestamp >= datetime.now() - max_age
+
+        return condition
+
+    @classmethod
+    def by_system(
+        cls, max_age: Optional[timedelta] = None
+    ) -> dict[int, tuple[bool, Optional[float]]]:
+        """Returns the online state and RTT by system ID
+        recorded by probes not older than max_age.
+        """
+        select = cls.select(cls.system, cls.online, cls.rtt)
+
+        if max_age is not None:
+            select = select.where(cls.timestamp >= datetime.now() - max_age)
+
+        return {system: (online, rtt) for system, online, rtt in select.tuples()}
+
+    @classmethod
+    def store(
+        cls, results: Iterable[ProbeResult], *, timestamp: Optional[datetime] = None
+    ) -> int:
+        """Bulk-upserts the given probe results.
+        Existing results of the systems are replaced.
+        Returns the amount of stored results.
+        """
+        timestamp = timestamp or datetime.now()
+        rows = [
+            {
+                "system": result.system.id,
+                "timestamp": timestamp,
+                "online": result.online,
+                "rtt": result.rtt,
+            }
+            for result in results
+        ]
+
+        with cls._meta.database.atomic():
+            for batch in chunked(rows, BATCH_SIZE):
+                cls.insert_many(batch).on_conflict_replace().execute()
+
+        return len(rows)
@@ -3,7 +3,7 @@
 from __future__ import annotations
 from datetime import datetime
 from ipaddress import IPv4Address, IPv6Address
-from typing import Iterator, Optional
+from typing import Iterable, Iterator, Optional
 
 from peewee import JOIN
 from peewee import BooleanField
@@ -23,19 +23,29 @@ from hwdb.config import get_wireguard_network
 from hwdb.ctrl import RemoteControllerMixin
 from hwdb.enumerations import OperatingSystem
 from hwdb.iptools import get_address
-from hwdb.orm.common import BaseModel
+from hwdb.orm.common import BaseModel, allocating
 from hwdb.orm.deployment import Deployment
 from hwdb.orm.group import Group
+from hwdb.orm.journal import Change
 from hwdb.orm.mixins import DeployingMixin, DNSMixin, MonitoringMixin
+from hwdb.orm.openvpn import COLUMNS as OPENVPN_COLUMNS
+from hwdb.orm.openvpn import LOCK as OPENVPN_LOCK
 from hwdb.orm.openvpn import OpenVPN
 from hwdb.types import IPAddress
 
 
-__all__ = ["System", "get_free_ipv6_address"]
+__all__ = ["RELATIONS", "System", "get_free_ipv6_address"]
 
 
-def get_free_ipv6_address() -> IPv6Address:
-    """Returns a free IPv6 address."""
+RELATIONS = frozenset({"group", "deployment", "dataset", "openvpn"})
+WIREGUARD_COLUMNS = frozenset({"ipv6address"})
+WIREGUARD_LOCK = "hwdb.wireguard"
+
+
+def free_ipv6_address() -> IPv6Address:
+    """Returns a free IPv6 address.
+    Callers must hold the advisory lock to prevent race conditions.
+    """
 
     return get_address(
         wireguard_network := get_wireguard_network(),
@@ -44,6 +54,15 @@ def get_free_ipv6_address() -> IPv6Address:
     )
 
 
+@allocating(WIREGUARD_LOCK, WIREGUARD_COLUMNS)
+def get_free_ipv6_address() -> IPv6Address:
+    """Returns a free IPv6 address under the advisory lock.
+    Use System.allocate_ipv6address() to also assign it within the lock.
+    """
+
+    return free_ipv6_address()
+
+
 class System(
     BaseModel,
     DeployingMixin,
@@ -106,95 +125,170 @@ class System(
     testing = BooleanField(default=False)
     isvirtual = BooleanField(default=False)
 
+    @classmethod
+    @allocating(OPENVPN_LOCK, OPENVPN_COLUMNS)
+    def provision(
+        cls,
+        amount: int,
+        *,
+        group: Group,
+        operating_system: OperatingSystem,
+        serial_number: Optional[str] = None,
+        model: Optional[str] = None,
+        key: Optional[str] = None,
+        mtu: Optional[int] = None,
+    ) -> list[System]:
+        """Adds the given amount of new systems in one transaction.
+        Returns the created systems.
+        """
+        openvpns = OpenVPN.allocate_many(amount, key=key, mtu=mtu)
+        cls.insert_many(
+            [
+                {
+                    "openvpn": openvpn.id,
+                    "group": group,
+                    "operating_system": operating_system,
+                    "serial_number": serial_number,
+                    "model": model,
+                }
+                for openvpn in openvpns
+            ]
+        ).execute()
+        systems = list(
+            cls.select(cascade=True, relations={"group", "openvpn"})
+            .where(cls.openvpn << openvpns)
+            .order_by(cls.id)
+        )
+        Change.add_many(OpenVPN, (openvpn.id for openvpn in openvpns))
+        Change.add_many(cls, (system.id for system in systems), systems=True)
+        return systems
+
     @classmethod
     def used_ipv6_addresses(cls) -> Iterator[IPv6Address]:
         """Yields used IPv6 addresses."""
-        for system in cls.select().where(~(cls.ipv6address >> None)):
-            yield system.ipv6address
+        for (ipv6address,) in (
+            cls.select(cls.ipv6address).where(~(cls.ipv6address >> None)).tuples()
+        ):
+            yield ipv6address
 
     @classmethod
-    def select(cls, *args, cascade: bool = False) -> Select:
-        """Selects systems."""
+    def select(
+        cls, *args, cascade: bool = False, relations: Iterable[str] = RELATIONS
+    ) -> Select:
+        """Selects systems.
+        If cascading, only the given relations are joined.
+        """
         if not cascade:
             return super().select(*args)
 
+        relations = frozenset(relations)
         lpt_address = Address.alias()
         dataset = Deployment.alias()
         ds_customer = Customer.alias()
         ds_company = Company.alias()
         ds_address = Address.alias()
         ds_lpt_address = Address.alias()
-        return (
-            super()
-            .select(
-                cls,
-                Group,
-                Customer,
-                Company,
-                Deployment,
-                Address,
-                lpt_address,
-                dataset,
-                ds_customer,
-                ds_company,
-                ds_address,
-                ds_lpt_address,
-                OpenVPN,
-                *args,
-            )
-            .join(
-                # Group
-                Group
-            )
-            .join_from(
-                # Deployment
-                cls,
-                Deployment,
-                on=cls.deployment == Deployment.id,
-                join_type=JOIN.LEFT_OUTER,
-            )
-            .join(Customer, join_type=JOIN.LEFT_OUTER)
-            .join(Company, join_type=JOIN.LEFT_OUTER)
-            .join_from(
-                Deployment,
-                Address,
-                on=Deployment.address == Address.id,
-                join_type=JOIN.LEFT_OUTER,
-            )
-            .join_from(
-                Deployment,
-                lpt_address,
-                on=Deployment.lpt_address == lpt_address.id,
-                join_type=JOIN.LEFT_OUTER,
-            )
-            .join_from(
-                # Dataset
-                cls,
-                dataset,
-                on=cls.dataset == dataset.id,
-                join_type=JOIN.LEFT_OUTER,
-            )
-            .join(ds_customer, join_type=JOIN.LEFT_OUTER)
-            .join(ds_company, join_type=JOIN.LEFT_OUTER)
-            .join_from(
-                dataset,
-                ds_address,
-                on=dataset.address == ds_address.id,
-                join_type=JOIN.LEFT_OUTER,
-            )
-            .join_from(
-                dataset,
-                ds_lpt_address,
-                on=dataset.lpt_address == ds_lpt_address.id,
-                join_type=JOIN.LEFT_OUTER,
+        models = [cls]
+
+        if "group" in relations:
+            models.append(Group)
+
+        if "deployment" in relations:
+            models += [Customer, Company, Deployment, Address, lpt_address]
+
+        if "dataset" in relations:
+            models += [dataset, ds_customer, ds_company, ds_address, ds_lpt_address]
+
+        if "openvpn" in relations:
+            models.append(OpenVPN)
+
+        select = super().select(*models, *args)
+
+        if "group" in relations:
+            select = select.join_from(cls, Group)
+
+        if "deployment" in relations:
+            select = (
+                select.join_from(
+                    cls,
+                    Deployment,
+                    on=cls.deployment == Deployment.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
+                .join(Customer, join_type=JOIN.LEFT_OUTER)
+                .join(Company, join_type=JOIN.LEFT_OUTER)
+                .join_from(
+                    Deployment,
+                    Address,
+                    on=Deployment.address == Address.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
+                .join_from(
+                    Deployment,
+                    lpt_address,
+                    on=Deployment.lpt_address == lpt_address.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
             )
-            .join_from(
-                # OpenVPN
-                cls,
-                OpenVPN,
-                join_type=JOIN.LEFT_OUTER,
+
+        if "dataset" in relations:
+            select = (
+                select.join_from(
+                    cls,
+                    dataset,
+                    on=cls.dataset == dataset.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
+                .join(ds_customer, join_type=JOIN.LEFT_OUTER)
+                .join(ds_company, join_type=JOIN.LEFT_OUTER)
+                .join_from(
+                    dataset,
+                    ds_address,
+                    on=dataset.address == ds_address.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
+                .join_from(
+                    dataset,
+                    ds_lpt_address,
+                    on=dataset.lpt_address == ds_lpt_address.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
             )
-        )
+
+        if "openvpn" in relations:
+            select = select.join_from(cls, OpenVPN, join_type=JOIN.LEFT_OUTER)
+
+        return select
+
+    def save(self, *args, **kwargs) -> int:
+        """Saves the system and journals the change."""
+        created = self.id is None
+        fields = {field.name for field in self.dirty_fields}
+        result = super().save(*args, **kwargs)
+
+        if created or fields:
+            Change.add(self, system=self.id, fields=None if created else fields)
+
+        return result
+
+    def delete_instance(self, *args, **kwargs) -> int:
+        """Deletes the system and journals the change."""
+        Change.add(self, system=self.id)
+        return super().delete_instance(*args, **kwargs)
+
+    @allocating(WIREGUARD_LOCK, WIREGUARD_COLUMNS)
+    def allocate_ipv6address(self, pubkey: Optional[str] = None) -> IPv6Address:
+        """Assigns a free WireGuard IPv6 address to the system
+        unless it already has one and sets the public key, if given.
+        """
+        if pubkey is not None:
+            self.pubkey = pubkey
+
+        if self.ipv6address is None:
+            self.ipv6address = free_ipv6_address()
+
+        self.save()
+        return self.ipv6address
 
     @property
     def ipv4address(self) -> IPv4Address:
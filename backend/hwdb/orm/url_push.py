@@ -0,0 +1,151 @@
+"""Outbox of URLs to be applied on systems."""
+
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+from peewee import DateTimeField
+from peewee import ForeignKeyField
+from peewee import IntegerField
+from peewee import Select
+from peewee import TextField
+
+from requests import Response
+
+from peeweeplus import EnumField
+
+from hwdb.config import LOGGER
+from hwdb.enumerations import PushStatus
+from hwdb.orm.common import BaseModel
+from hwdb.orm.system import System
+
+
+__all__ = ["URLPush"]
+
+
+BACKOFF = 60  # Seconds before the first retry.
+MAX_ATTEMPTS = 5
+
+
+class URLPush(BaseModel):
+    """A URL to be applied on a system."""
+
+    class Meta:  # pylint: disable=C0115,R0903
+        table_name = "url_push"
+
+    system = ForeignKeyField(
+        System,
+        column_name="system",
+        backref="url_pushes",
+        on_delete="CASCADE",
+        on_update="CASCADE",
+        lazy_load=False,
+    )
+    url = TextField()
+    status = EnumField(PushStatus, default=PushStatus.PENDING)
+    created = DateTimeField(default=datetime.now)
+    attempts = IntegerField(default=0)
+    next_attempt = DateTimeField(default=datetime.now, index=True)
+    error = TextField(null=True)
+
+    @classmethod
+    def enqueue(cls, system: Union[System, int], url: str) -> URLPush:
+        """Enqueues the URL for the system.
+        Pending pushes to the system are superseded.
+        """
+        cls.update(status=PushStatus.SUPERSEDED).where(
+            (cls.system == system) & (cls.status == PushStatus.PENDING)
+        ).execute()
+        push = cls(system=system, url=url)
+        push.save()
+        return push
+
+    @classmethod
+    def due(cls, now: Optional[datetime] = None) -> Select:
+        """Selects pending pushes that are due."""
+        return (
+            cls.select()
+            .where(
+                (cls.status == PushStatus.PENDING)
+                & (cls.next_attempt <= (now or datetime.now()))
+            )
+            .order_by(cls.id)
+        )
+
+    def settle(
+        self,
+        response: Optional[Response],
+        error: Optional[Exception],
+        *,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff: float = BACKOFF,
+    ) -> bool:
+        """Records the outcome of an attempt to apply the URL.
+        Returns True if the URL was applied.
+        """
+        if error is not None:
+            reason = str(error) or type(error).__name__
+        elif response.status_code != 200:
+            reason = f"HTTP {response.status_code}"
+        elif self.succeed():
+            LOGGER.info("Pushed URL to system #%i.", self.system_id)
+            return True
+        else:
+            return False
+
+        LOGGER.warning("Could not push URL to system #%i: %s", self.system_id, reason)
+        self.fail(reason, max_attempts=max_attempts, backoff=backoff)
+        return False
+
+    def succeed(self) -> bool:
+        """Marks the push as done unless it was superseded meanwhile."""
+        return self._transition(status=PushStatus.DONE, error=None)
+
+    def fail(
+        self,
+        error: str,
+        *,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff: float = BACKOFF,
+    ) -> bool:
+        """Records a failed attempt and schedules the next one with an
+        exponential backoff or marks the push as failed after the last one.
+        """
+        attempts = self.attempts + 1
+        return self._transition(
+            status=PushStatus.FAILED
+            if attempts >= max_attempts
+            else PushStatus.PENDING,
+            attempts=attempts,
+            next_attempt=datetime.now()
+            + timedelta(seconds=backoff * 2 ** (attempts - 1)),
+            error=error,
+        )
+
+    def _transition(self, **fields) -> bool:
+        """Updates the fields of the pending push.
+        Returns False if it is no longer pending.
+        Once the push is done or failed, older pending
+        pushes to the same system are superseded.
+        """
+        cls = type(self)
+        updated = (
+            cls.update(**fields)
+            .where((cls.id == self.id) & (cls.status == PushStatus.PENDING))
+            .execute()
+        )
+
+        if not updated:
+            return False
+
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+        if self.status != PushStatus.PENDING:
+            cls.update(status=PushStatus.SUPERSEDED).where(
+                (cls.system == self.system_id)
+                & (cls.status == PushStatus.PENDING)
+                & (cls.id < self.id)
+            ).execute()
+
+        return True
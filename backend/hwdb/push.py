@@ -0,0 +1,95 @@
+"""Concurrent push of deployment URLs from the outbox."""
+
+from typing import NamedTuple, Optional
+
+from requests import RequestException
+
+from hwdb.config import get_config
+from hwdb.enumerations import PushStatus
+from hwdb.exceptions import SystemOffline
+from hwdb.fanout import fanout
+from hwdb.orm.system import System
+from hwdb.orm.url_push import BACKOFF, MAX_ATTEMPTS, URLPush
+
+
+__all__ = ["PushSummary", "push_urls"]
+
+
+DEFERRED = (SystemOffline, RequestException, TimeoutError)
+TIMEOUT = 15
+WORKERS = 16
+
+
+class PushSummary(NamedTuple):
+    """Outcome of draining the URL outbox."""
+
+    due: int
+    succeeded: int
+    errors: int  # Failures other than unreachable systems.
+
+
+def get_pushes() -> dict[int, URLPush]:
+    """Returns the due pushes by system ID.
+    Only the latest push to each system is returned.
+    Older due pushes to the same system are superseded.
+    """
+
+    pushes, stale = {}, []
+
+    for push in URLPush.due():
+        if (older := pushes.get(push.system_id)) is not None:
+            stale.append(older.id)
+
+        pushes[push.system_id] = push
+
+    if stale:
+        URLPush.update(status=PushStatus.SUPERSEDED).where(
+            (URLPush.id << stale) & (URLPush.status == PushStatus.PENDING)
+        ).execute()
+
+    return pushes
+
+
+def push_urls(
+    *,
+    workers: Optional[int] = None,
+    timeout: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+    backoff: Optional[float] = None,
+) -> PushSummary:
+    """Applies the due URLs on their systems concurrently.
+    Failed pushes are retried with an exponential backoff.
+    Unreachable systems and HTTP errors are deferred to the retries,
+    any other exception is counted as an error.
+    """
+
+    config = get_config()
+    workers = workers or config.getint("push", "workers", fallback=WORKERS)
+    timeout = timeout or config.getint("push", "timeout", fallback=TIMEOUT)
+    max_attempts = max_attempts or config.getint(
+        "push", "max_attempts", fallback=MAX_ATTEMPTS
+    )
+    backoff = backoff or config.getfloat("push", "backoff", fallback=BACKOFF)
+
+    if not (pushes := get_pushes()):
+        return PushSummary(0, 0, 0)
+
+    succeeded = errors = 0
+
+    for result in fanout(
+        System.select(cascade=True).where(System.id << list(pushes)),
+        lambda system: system.apply_url(pushes[system.id].url),
+        workers=workers,
+        deadline=timeout,
+    ):
+        if pushes[result.system.id].settle(
+            result.response,
+            result.error,
+            max_attempts=max_attempts,
+            backoff=backoff,
+        ):
+            succeeded += 1
+        elif result.error is not None and not isinstance(result.error, DEFERRED):
+            errors += 1
+
+    return PushSummary(len(pushes), succeeded, errors)
@@ -0,0 +1,151 @@
+"""Shared cache of system reachability."""
+
+from functools import cache
+from pathlib import Path
+from sqlite3 import Error, connect
+from threading import Lock
+from time import time
+from typing import Iterable, Optional, Union
+
+from hwdb.config import LOGGER, get_config
+from hwdb.types import IPAddress, ProbeResult
+
+
+__all__ = ["ReachabilityCache", "get_reachability_cache"]
+
+
+CACHE_FILE = "/var/cache/hwdb/reachability.sqlite"
+NEGATIVE_TTL = 60
+TTL = 300
+SCHEMA = """CREATE TABLE IF NOT EXISTS reachability (
+    system INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    online INTEGER NOT NULL,
+    rtt REAL,
+    timestamp REAL NOT NULL,
+    PRIMARY KEY (system, address)
+)"""
+UPSERT = "INSERT OR REPLACE INTO reachability VALUES (?, ?, ?, ?, ?)"
+
+
+class ReachabilityCache:
+    """Caches the online state of systems by system ID and IP address.
+    Positive and negative results expire after their respective TTL.
+
+    SQLite opens files that it cannot write, e.g. ones created by another
+    user, read-only and concurrent writers may find the database locked.
+    Such errors are logged and the results are not cached, so that the
+    cache never fails its callers.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str] = ":memory:",
+        *,
+        ttl: float = TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+    ):
+        """Opens the SQLite database at the given path."""
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = Lock()
+        self.connection = connect(str(path), timeout=5, check_same_thread=False)
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def get(self, system: int, address: IPAddress) -> Optional[bool]:
+        """Returns the cached online state or None if there is none."""
+        with self.lock:
+            try:
+                row = self.connection.execute(
+                    "SELECT online, timestamp FROM reachability "
+                    "WHERE system = ? AND address = ?",
+                    (system, str(address)),
+                ).fetchone()
+            except Error as error:
+                LOGGER.warning("Could not read reachability cache: %s", error)
+                return None
+
+        if row is None:
+            return None
+
+        online, timestamp = bool(row[0]), row[1]
+
+        if time() - timestamp > (self.ttl if online else self.negative_ttl):
+            return None
+
+        return online
+
+    def set(
+        self,
+        system: int,
+        address: IPAddress,
+        online: bool,
+        rtt: Optional[float] = None,
+    ) -> None:
+        """Caches the online state of a system."""
+        self.set_many([(system, address, online, rtt)])
+
+    def set_many(
+        self, entries: Iterable[tuple[int, IPAddress, bool, Optional[float]]]
+    ) -> None:
+        """Caches multiple tuples of system ID, address, state and RTT."""
+        timestamp = time()
+        rows = [
+            (system, str(address), online, rtt, timestamp)
+            for system, address, online, rtt in entries
+        ]
+
+        with self.lock:
+            self._write(UPSERT, rows)
+
+    def store(self, results: Iterable[ProbeResult]) -> None:
+        """Caches the given probe results."""
+        self.set_many(
+            (result.system.id, result.address, result.online, result.rtt)
+            for result in results
+            if result.address is not None
+        )
+
+    def clear(self) -> None:
+        """Removes all cached entries."""
+        with self.lock:
+            self._write("DELETE FROM reachability")
+
+    def _write(self, statement: str, rows: Optional[list[tuple]] = None) -> None:
+        """Executes a writing statement for all rows, if given.
+        Callers must hold the lock.
+        """
+        try:
+            if rows is None:
+                self.connection.execute(statement)
+            else:
+                self.connection.executemany(statement, rows)
+
+            self.connection.commit()
+        except Error as error:
+            self.connection.rollback()
+            LOGGER.warning("Could not write reachability cache: %s", error)
+
+
+@cache
+def get_reachability_cache() -> ReachabilityCache:
+    """Returns the configured reachability cache.
+    Falls back to an in-memory cache if the cache file cannot be opened.
+    If it is opened read-only, results are not cached.
+    """
+
+    config = get_config()
+    ttl = config.getfloat("reachability", "ttl", fallback=TTL)
+    negative_ttl = config.getfloat(
+        "reachability", "negative_ttl", fallback=NEGATIVE_TTL
+    )
+    path = Path(config.get("reachability", "cache_file", fallback=CACHE_FILE))
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return ReachabilityCache(path, ttl=ttl, negative_ttl=negative_ttl)
+    except (OSError, Error) as error:
+        LOGGER.debug("Using in-memory reachability cache: %s", error)
+
+    return ReachabilityCache(ttl=ttl, negative_ttl=negative_ttl)
@@ -0,0 +1,233 @@
+"""Batch collection of screenshots."""
+
+from functools import partial
+from io import BytesIO
+from json import dumps
+from pathlib import Path
+from tarfile import TarFile, TarInfo
+from tarfile import open as open_tar
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+from threading import Lock
+from time import time
+from typing import Iterable, Optional
+
+from hwdb.config import LOGGER
+from hwdb.fanout import Result, fanout
+from hwdb.orm.system import System
+from hwdb.timeouts import SLOW_TIMEOUT, TimeoutSpec
+
+
+__all__ = ["collect_screenshots", "download_screenshot"]
+
+
+CHUNK_SIZE = 64 * 1024
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+MANIFEST = "manifest.json"
+TAR_MODES = {".tar": "w", ".tar.gz": "w:gz", ".tgz": "w:gz", ".tar.xz": "w:xz"}
+TIMEOUT = 15
+WORKERS = 16
+
+
+def get_tar_mode(path: Path) -> Optional[str]:
+    """Returns the write mode if the path denotes a tar archive."""
+
+    for suffix, mode in TAR_MODES.items():
+        if path.name.endswith(suffix):
+            return mode
+
+    return None
+
+
+class Downloads:
+    """Tracks the downloads of a collection.
+
+    Downloads still running past their deadline cannot be interrupted.
+    Once the collector abandoned them, they must neither create nor
+    place files, so that the output matches the manifest.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.closed = False
+        self.abandoned: set[int] = set()
+        self.placed: dict[int, Path] = {}
+
+    def check(self, system: int) -> None:
+        """Raises a TimeoutError if the download was abandoned."""
+        if self.closed or system in self.abandoned:
+            raise TimeoutError("Download abandoned.")
+
+    def place(self, system: int, tmp: Path, path: Path) -> None:
+        """Renames the temporary file unless the download was abandoned."""
+        with self.lock:
+            self.check(system)
+            tmp.replace(path)
+            self.placed[system] = path
+
+    def abandon(self, system: int) -> Optional[Path]:
+        """Abandons the download.
+        Returns the path of the file if it was already placed.
+        """
+        with self.lock:
+            self.abandoned.add(system)
+            return self.placed.pop(system, None)
+
+    def close(self) -> None:
+        """Abandons all remaining downloads."""
+        with self.lock:
+            self.closed = True
+
+
+def download_screenshot(
+    system: System,
+    directory: Path,
+    *,
+    timeout: TimeoutSpec = SLOW_TIMEOUT,
+    chunk_size: int = CHUNK_SIZE,
+    downloads: Optional[Downloads] = None,
+) -> tuple[Path, int]:
+    """Streams the system's screenshot into a file in the directory.
+    The file is written under a temporary name, which is only renamed
+    once the download finished and, if tracked, was not abandoned.
+    Returns the path and size of the file.
+    """
+
+    downloads = downloads or Downloads()
+
+    with system.screenshot(timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0]
+        path = directory / f"{system.id}.{EXTENSIONS.get(content_type, 'png')}"
+        size = 0
+        downloads.check(system.id)
+        tmp = NamedTemporaryFile(
+            "wb", dir=directory, prefix=f".{path.name}.", delete=False
+        )
+
+        try:
+            with tmp:
+                for chunk in response.iter_content(chunk_size):
+                    downloads.check(system.id)
+                    tmp.write(chunk)
+                    size += len(chunk)
+
+            downloads.place(system.id, Path(tmp.name), path)
+        except BaseException:
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+
+    return path, size
+
+
+def add_manifest(tar: TarFile, manifest: list[dict]) -> None:
+    """Adds the manifest to the tar archive."""
+
+    data = dumps(manifest, indent=2).encode()
+    info = TarInfo(MANIFEST)
+    info.size = len(data)
+    info.mtime = int(time())
+    tar.addfile(info, BytesIO(data))
+
+
+def collect(
+    systems: Iterable[System],
+    directory: Path,
+    *,
+    tar: Optional[TarFile] = None,
+    workers: int = WORKERS,
+    timeout: Optional[int] = TIMEOUT,
+    chunk_size: int = CHUNK_SIZE,
+) -> list[dict]:
+    """Downloads the screenshots into the directory or,
+    if given, moves them into the tar archive as they arrive.
+    The adaptive timeouts of the downloads are capped by the given timeout.
+    Downloads exceeding the timeout are abandoned and
+    their files discarded, even if they finish later.
+    Returns the manifest.
+    """
+
+    manifest = []
+    downloads = Downloads()
+
+    try:
+        for result in fanout(
+            systems,
+            partial(
+                download_screenshot,
+                directory=directory,
+                chunk_size=chunk_size,
+                downloads=downloads,
+            ),
+            workers=workers,
+            deadline=timeout,
+        ):
+            manifest.append(record(result, tar, downloads))
+    finally:
+        downloads.close()
+
+    return sorted(manifest, key=lambda entry: entry["system"])
+
+
+def record(result: Result, tar: Optional[TarFile], downloads: Downloads) -> dict:
+    """Returns the manifest entry of the download's result and moves
+    the file into the tar archive, if given.
+    """
+
+    entry = {
+        "system": result.system.id,
+        "file": None,
+        "size": None,
+        "latency": round(result.latency, 3),
+        "error": None,
+    }
+
+    if result.error is not None:
+        if (path := downloads.abandon(result.system.id)) is not None:
+            path.unlink(missing_ok=True)  # Finished after its deadline.
+
+        LOGGER.warning("No screenshot of #%i: %s", result.system.id, result.error)
+        entry["error"] = str(result.error) or type(result.error).__name__
+        return entry
+
+    path, entry["size"] = result.response
+    entry["file"] = path.name
+
+    if tar is not None:
+        tar.add(path, arcname=path.name)
+        path.unlink()
+
+    return entry
+
+
+def collect_screenshots(
+    systems: Iterable[System],
+    target: Path,
+    *,
+    workers: int = WORKERS,
+    timeout: Optional[int] = TIMEOUT,
+    chunk_size: int = CHUNK_SIZE,
+) -> list[dict]:
+    """Collects screenshots of the systems concurrently.
+
+    The images are streamed in chunks to the target directory or, if the
+    target is a tar archive, to a staging directory next to it, so that
+    memory usage does not depend on the image sizes.
+    A manifest of successes, failures and timings is written to the
+    directory or archive and returned.
+    """
+
+    kwargs = {"workers": workers, "timeout": timeout, "chunk_size": chunk_size}
+
+    if (mode := get_tar_mode(target)) is None:
+        target.mkdir(parents=True, exist_ok=True)
+        manifest = collect(systems, target, **kwargs)
+        (target / MANIFEST).write_text(dumps(manifest, indent=2))
+        return manifest
+
+    with TemporaryDirectory(
+        dir=target.parent, prefix=f".{target.name}."
+    ) as staging, open_tar(target, mode) as tar:
+        manifest = collect(systems, Path(staging), tar=tar, **kwargs)
+        add_manifest(tar, manifest)
+
+    return manifest
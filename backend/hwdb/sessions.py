@@ -0,0 +1,122 @@
+"""Pooled keep-alive HTTP sessions for remote control."""
+
+from collections import OrderedDict
+from functools import cache
+from threading import Lock
+from time import monotonic
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from hwdb.config import get_config
+from hwdb.types import IPSocket
+
+
+__all__ = ["SessionPool", "close_sessions", "get_session", "get_session_pool"]
+
+
+CONNECTIONS = 4  # Keep-alive connections per socket.
+IDLE_TIMEOUT = 60
+MAX_SESSIONS = 256
+
+
+class SessionPool:
+    """A bounded pool of keep-alive sessions by IP socket.
+
+    Sessions that have not been used within the idle timeout are closed.
+    If the pool is full, the least recently used session is closed.
+    Thus, there are at most max_sessions * connections connections.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int = MAX_SESSIONS,
+        connections: int = CONNECTIONS,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ):
+        self.max_sessions = max_sessions
+        self.connections = connections
+        self.idle_timeout = idle_timeout
+        self.lock = Lock()
+        self.sessions: OrderedDict[IPSocket, tuple[Session, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _new_session(self) -> Session:
+        """Returns a new session with a bounded connection pool."""
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.connections)
+        session = Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _prune(self, now: float) -> None:
+        """Closes idle sessions.
+        Callers must hold the lock.
+        """
+        while self.sessions:
+            socket, (session, last_used) = next(iter(self.sessions.items()))
+
+            if now - last_used <= self.idle_timeout:
+                break
+
+            del self.sessions[socket]
+            session.close()
+
+        while len(self.sessions) >= self.max_sessions:
+            _, (session, _) = self.sessions.popitem(last=False)
+            session.close()
+
+    def get(self, socket: IPSocket) -> Session:
+        """Returns the session for the given socket."""
+        now = monotonic()
+
+        with self.lock:
+            try:
+                session, _ = self.sessions.pop(socket)
+            except KeyError:
+                self._prune(now)
+                session = self._new_session()
+
+            self.sessions[socket] = (session, now)
+
+        return session
+
+    def close(self) -> None:
+        """Closes all sessions."""
+        with self.lock:
+            while self.sessions:
+                _, (session, _) = self.sessions.popitem()
+                session.close()
+
+
+@cache
+def get_session_pool() -> SessionPool:
+    """Returns the configured session pool."""
+
+    config = get_config()
+    return SessionPool(
+        max_sessions=config.getint("http", "max_sessions", fallback=MAX_SESSIONS),
+        connections=config.getint("http", "connections", fallback=CONNECTIONS),
+        idle_timeout=config.getfloat("http", "idle_timeout", fallback=IDLE_TIMEOUT),
+    )
+
+
+def get_session(socket: IPSocket) -> Session:
+    """Returns the pooled session for the given socket."""
+
+    return get_session_pool().get(socket)
+
+
+def close_sessions() -> None:
+    """Closes all pooled sessions."""
+
+    get_session_pool().close()
@@ -0,0 +1,331 @@
+"""Time-series store of scraped system information."""
+
+from argparse import ArgumentParser, Namespace
+from functools import cache
+from json import dumps, loads
+from logging import DEBUG, INFO, basicConfig
+from pathlib import Path
+from random import shuffle, uniform
+from sqlite3 import connect
+from threading import Lock
+from time import monotonic, sleep, time
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from hwdb.config import LOG_FORMAT, LOGGER, get_config
+from hwdb.fanout import fanout
+from hwdb.orm.system import System
+
+
+__all__ = ["SysinfoStore", "flatten", "get_sysinfo_store", "scrape", "main"]
+
+
+BUCKET = 3600  # Resolution of downsampled samples in seconds.
+DOWNSAMPLE_AFTER = 86400
+INTERVAL = 300
+JITTER = 0.1
+RETENTION = 30 * 86400
+STORE_FILE = "/var/lib/hwdb/sysinfo.sqlite"
+TIMEOUT = 10
+WORKERS = 32
+SCHEMA = """CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    metric INTEGER NOT NULL,
+    system INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (metric, system, timestamp)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS downsampled (
+    metric INTEGER NOT NULL,
+    system INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    value REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (metric, system, timestamp)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS latest (
+    system INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    sysinfo TEXT NOT NULL
+);"""
+
+
+def flatten(json: Any, prefix: str = "") -> Iterator[tuple[str, float]]:
+    """Yields the numeric values of the JSON object by their dotted paths."""
+
+    if isinstance(json, dict):
+        for key, value in json.items():
+            yield from flatten(value, f"{prefix}{key}.")
+    elif isinstance(json, list):
+        for index, value in enumerate(json):
+            yield from flatten(value, f"{prefix}{index}.")
+    elif isinstance(json, (bool, int, float)):
+        yield prefix[:-1], float(json)
+
+
+class SysinfoStore:
+    """Stores numeric sysinfo values as samples per metric and system.
+
+    Samples older than downsample_after seconds are averaged into buckets
+    of the given resolution. Samples older than the retention are removed.
+    The last complete sysinfo of each system is kept for dashboards.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str] = ":memory:",
+        *,
+        retention: int = RETENTION,
+        downsample_after: int = DOWNSAMPLE_AFTER,
+        bucket: int = BUCKET,
+    ):
+        """Opens the SQLite database at the given path."""
+        self.retention = retention
+        self.downsample_after = downsample_after
+        self.bucket = bucket
+        self.lock = Lock()
+        self.metrics = {}
+        self.connection = connect(str(path), timeout=5, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def _metric_ids(self, names: Iterable[str]) -> dict[str, int]:
+        """Returns the IDs of the metrics, adding missing ones.
+        Callers must hold the lock.
+        """
+        if missing := set(names) - self.metrics.keys():
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO metrics (name) VALUES (?)",
+                [(name,) for name in missing],
+            )
+            self.metrics.update(
+                (name, ident)
+                for ident, name in self.connection.execute(
+                    "SELECT id, name FROM metrics"
+                )
+            )
+
+        return self.metrics
+
+    def store(
+        self, system: int, sysinfo: dict, *, timestamp: Optional[float] = None
+    ) -> int:
+        """Stores the system's sysinfo.
+        Returns the amount of stored samples.
+        """
+        timestamp = int(timestamp or time())
+        values = dict(flatten(sysinfo))
+
+        with self.lock:
+            metrics = self._metric_ids(values)
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?)",
+                [
+                    (metrics[name], system, timestamp, value)
+                    for name, value in values.items()
+                ],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO latest VALUES (?, ?, ?)",
+                (system, timestamp, dumps(sysinfo)),
+            )
+            self.connection.commit()
+
+        return len(values)
+
+    def latest(
+        self, systems: Optional[Iterable[int]] = None
+    ) -> dict[int, tuple[int, dict]]:
+        """Returns the timestamp and last sysinfo by system ID."""
+        query = "SELECT system, timestamp, sysinfo FROM latest"
+        params = ()
+
+        if systems is not None:
+            params = tuple(systems)
+            query += f" WHERE system IN ({', '.join('?' * len(params))})"
+
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+
+        return {
+            system: (timestamp, loads(sysinfo)) for system, timestamp, sysinfo in rows
+        }
+
+    def latest_value(self, metric: str) -> dict[int, tuple[int, float]]:
+        """Returns the timestamp and latest value of the metric by system ID."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT samples.system, MAX(samples.timestamp), samples.value "
+                "FROM samples JOIN metrics ON metrics.id = samples.metric "
+                "WHERE metrics.name = ? GROUP BY samples.system",
+                (metric,),
+            ).fetchall()
+
+        return {system: (timestamp, value) for system, timestamp, value in rows}
+
+    def series(
+        self, system: int, metric: str, *, since: Optional[float] = None
+    ) -> list[tuple[int, float]]:
+        """Returns the downsampled and raw values
+        of the system's metric ordered by their timestamp.
+        """
+        since = int(since or 0)
+
+        with self.lock:
+            return self.connection.execute(
+                "SELECT timestamp, value FROM ("
+                "SELECT metric, system, timestamp, value FROM downsampled "
+                "UNION ALL SELECT metric, system, timestamp, value FROM samples"
+                ") AS series JOIN metrics ON metrics.id = series.metric "
+                "WHERE metrics.name = ? AND series.system = ? "
+                "AND series.timestamp >= ? ORDER BY timestamp",
+                (metric, system, since),
+            ).fetchall()
+
+    def compact(self, *, now: Optional[float] = None) -> None:
+        """Downsamples old samples and removes expired ones.
+        Only complete buckets are downsampled, so that each bucket
+        is aggregated exactly once.
+        """
+        now = int(now or time())
+        cutoff = (now - self.downsample_after) // self.bucket * self.bucket
+        expired = now - self.retention
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO downsampled "
+                "SELECT metric, system, timestamp / ? * ?, AVG(value), COUNT(*) "
+                "FROM samples WHERE timestamp < ? "
+                "GROUP BY metric, system, timestamp / ?",
+                (self.bucket, self.bucket, cutoff, self.bucket),
+            )
+            self.connection.execute(
+                "DELETE FROM samples WHERE timestamp < ?", (cutoff,)
+            )
+            self.connection.execute(
+                "DELETE FROM downsampled WHERE timestamp < ?", (expired,)
+            )
+            self.connection.commit()
+
+
+@cache
+def get_sysinfo_store() -> SysinfoStore:
+    """Returns the configured sysinfo store."""
+
+    config = get_config()
+    path = Path(config.get("sysinfo", "store_file", fallback=STORE_FILE))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return SysinfoStore(
+        path,
+        retention=config.getint("sysinfo", "retention", fallback=RETENTION),
+        downsample_after=config.getint(
+            "sysinfo", "downsample_after", fallback=DOWNSAMPLE_AFTER
+        ),
+        bucket=config.getint("sysinfo", "bucket", fallback=BUCKET),
+    )
+
+
+def scrape(
+    systems: Iterable[System],
+    store: SysinfoStore,
+    *,
+    workers: int = WORKERS,
+    timeout: Optional[int] = TIMEOUT,
+) -> int:
+    """Queries the sysinfo of the systems concurrently and stores it.
+    The adaptive timeouts of the queries are capped by the given timeout.
+    Returns the amount of systems that replied.
+    """
+
+    replied = 0
+
+    for result in fanout(systems, "sysinfo", workers=workers, deadline=timeout):
+        if result.error is not None:
+            LOGGER.debug("No sysinfo of #%i: %s", result.system.id, result.error)
+            continue
+
+        if result.response.status_code != 200:
+            LOGGER.debug("No sysinfo of #%i: %s", result.system.id, result.response)
+            continue
+
+        try:
+            sysinfo = result.response.json()
+        except ValueError:
+            LOGGER.warning("Invalid sysinfo of #%i.", result.system.id)
+            continue
+
+        store.store(result.system.id, sysinfo)
+        replied += 1
+
+    return replied
+
+
+def get_args() -> Namespace:
+    """Parses the command line arguments."""
+
+    config = get_config()
+    parser = ArgumentParser(description="Scrapes sysinfo of monitored systems.")
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=config.getfloat("sysinfo", "interval", fallback=INTERVAL),
+        metavar="seconds",
+        help="interval between scrapes",
+    )
+    parser.add_argument(
+        "-J",
+        "--jitter",
+        type=float,
+        default=config.getfloat("sysinfo", "jitter", fallback=JITTER),
+        metavar="fraction",
+        help="random variation of the interval",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=config.getint("sysinfo", "workers", fallback=WORKERS),
+        metavar="n",
+        help="amount of concurrent queries",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=int,
+        default=config.getint("sysinfo", "timeout", fallback=TIMEOUT),
+        metavar="seconds",
+        help="timeout of each query",
+    )
+    parser.add_argument(
+        "-1", "--once", action="store_true", help="scrape once and exit"
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="turn on verbose logging"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs the sysinfo scraper daemon."""
+
+    args = get_args()
+    basicConfig(level=DEBUG if args.verbose else INFO, format=LOG_FORMAT)
+    store = get_sysinfo_store()
+
+    while True:
+        start = monotonic()
+        systems = list(System.monitored())
+        shuffle(systems)  # Spread the load of co-located systems.
+        replied = scrape(systems, store, workers=args.workers, timeout=args.timeout)
+        LOGGER.info("Scraped sysinfo of %i of %i systems.", replied, len(systems))
+        store.compact()
+
+        if args.once:
+            return 0
+
+        interval = args.interval * uniform(1 - args.jitter, 1 + args.jitter)
+        sleep(max(0, interval - (monotonic() - start)))
@@ -27,7 +27,7 @@ def root(logger: Logger, returncode: int = 1) -> Callable:
                 logger.error("You must be root to run %s.", function.__name__)
                 exit(returncode)
 
-            function(*args, **kwargs)
+            return function(*args, **kwargs)
 
         return wrapper
 
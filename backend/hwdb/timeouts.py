@@ -0,0 +1,141 @@
+"""Adaptive timeouts from observed response latencies."""
+
+from collections import deque
+from functools import cache
+from threading import Lock
+from typing import Any, NamedTuple, Optional, Union
+
+from hwdb.config import get_config
+
+
+__all__ = [
+    "DEFAULT_TIMEOUT",
+    "SLOW_TIMEOUT",
+    "DefaultTimeout",
+    "LatencyTracker",
+    "TimeoutSpec",
+    "get_latency_tracker",
+]
+
+
+CEILING = 30.0
+CENSORED = float("inf")  # Latency of a request that timed out.
+FACTOR = 3.0
+FLOOR = 2.0
+MIN_SAMPLES = 5
+PERCENTILE = 0.95
+WINDOW = 50
+
+
+class DefaultTimeout(NamedTuple):
+    """A timeout that adapts to the observed latencies.
+    The fallback applies as long as too few latencies were observed.
+    """
+
+    fallback: float
+
+
+DEFAULT_TIMEOUT = DefaultTimeout(10)
+SLOW_TIMEOUT = DefaultTimeout(15)
+TimeoutSpec = Union[DefaultTimeout, Optional[float]]
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of the samples."""
+
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class LatencyTracker:
+    """Records response latencies in rolling windows per system and per
+    connection type and derives timeouts from a high percentile of them.
+
+    The system's own window is used once it holds min_samples latencies.
+    Until then, the window of its connection type is used, and the
+    fallback if this has too few latencies as well. The percentile is
+    multiplied by the factor and clamped between floor and ceiling.
+
+    Timeouts are recorded as censored samples in the system's window only,
+    since the actual latency is unknown. If the percentile falls on a
+    censored sample, the fallback is used, so that unreachable systems
+    neither raise their own timeout nor those of their connection type.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: int = WINDOW,
+        percentile: float = PERCENTILE,  # pylint: disable=W0621
+        factor: float = FACTOR,
+        floor: float = FLOOR,
+        ceiling: float = CEILING,
+        min_samples: int = MIN_SAMPLES,
+    ):
+        self.window = window
+        self.percentile = percentile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+        self.lock = Lock()
+        self.systems: dict[int, deque[float]] = {}
+        self.connections: dict[Any, deque[float]] = {}
+
+    def record(self, system: int, connection: Any, latency: float) -> None:
+        """Records a response latency of the system."""
+        with self.lock:
+            self.systems.setdefault(system, deque(maxlen=self.window)).append(latency)
+            self.connections.setdefault(
+                connection, deque(maxlen=self.window * 10)
+            ).append(latency)
+
+    def record_timeout(self, system: int) -> None:
+        """Records a censored latency of the system, which timed out."""
+        with self.lock:
+            self.systems.setdefault(system, deque(maxlen=self.window)).append(CENSORED)
+
+    def samples(self, system: int, connection: Any) -> Optional[list[float]]:
+        """Returns the latencies the system's timeout is derived from."""
+        with self.lock:
+            for samples in (self.systems.get(system), self.connections.get(connection)):
+                if samples is not None and len(samples) >= self.min_samples:
+                    return list(samples)
+
+        return None
+
+    def timeout(self, system: int, connection: Any, fallback: float) -> float:
+        """Returns the adaptive timeout of the system."""
+        if (samples := self.samples(system, connection)) is None:
+            return fallback
+
+        if (latency := percentile(samples, self.percentile)) == CENSORED:
+            return fallback
+
+        return min(self.ceiling, max(self.floor, latency * self.factor))
+
+    def resolve(
+        self, system: int, connection: Any, timeout: TimeoutSpec
+    ) -> Optional[float]:
+        """Returns the adaptive timeout for default timeouts
+        and explicitly given timeouts unchanged.
+        """
+        if isinstance(timeout, DefaultTimeout):
+            return self.timeout(system, connection, timeout.fallback)
+
+        return timeout
+
+
+@cache
+def get_latency_tracker() -> LatencyTracker:
+    """Returns the configured latency tracker."""
+
+    config = get_config()
+    return LatencyTracker(
+        window=config.getint("timeouts", "window", fallback=WINDOW),
+        percentile=config.getfloat("timeouts", "percentile", fallback=PERCENTILE),
+        factor=config.getfloat("timeouts", "factor", fallback=FACTOR),
+        floor=config.getfloat("timeouts", "floor", fallback=FLOOR),
+        ceiling=config.getfloat("timeouts", "ceiling", fallback=CEILING),
+        min_samples=config.getint("timeouts", "min_samples", fallback=MIN_SAMPLES),
+    )
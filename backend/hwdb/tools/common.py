@@ -4,20 +4,26 @@ from sys import stderr, stdout
 from typing import Callable, Dict, Iterable, Iterator
 
 
-__all__ = ["format_iter", "iter_print", "FieldFormatter"]
+__all__ = ["format_iter", "iter_print", "relations", "FieldFormatter"]
 
 
 class FieldFormatter:
     """Wrapper to access terminal properties."""
 
     def __init__(
-        self, getter: Callable, caption: str, size: int = 0, align_left: bool = False
+        self,
+        getter: Callable,
+        caption: str,
+        size: int = 0,
+        align_left: bool = False,
+        relations: Iterable[str] = frozenset(),
     ):
-        """Sets the field's name"""
+        """Sets the field's name and the relations the getter needs."""
         self.getter = getter
         self.caption = caption
         self.size = size
         self.align_left = align_left
+        self.relations = frozenset(relations)
 
     def __str__(self):
         """Returns the formatted caption."""
@@ -58,6 +64,12 @@ def format_iter(
         yield sep.join(formatter.format(item) for formatter in formatters)
 
 
+def relations(mapping: Dict[object, FieldFormatter], keys: Iterable) -> set[str]:
+    """Returns the relations needed to format the respective fields."""
+
+    return {relation for key in keys for relation in mapping[key].relations}
+
+
 def iter_print(iterable: Iterable) -> bool:
     """Prints items line by line, handling multiple possible I/O errors."""
 
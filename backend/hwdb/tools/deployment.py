@@ -8,12 +8,20 @@ from peewee import Select
 
 from mdb import Address
 
-from hwdb.tools.common import format_iter, FieldFormatter
+from hwdb.tools.common import format_iter, relations, FieldFormatter
 from hwdb.exceptions import TerminalError, AmbiguityError
 from hwdb.orm import Deployment
 
 
-__all__ = ["DEFAULT_FIELDS", "DeploymentField", "find", "get", "listdep", "printdep"]
+__all__ = [
+    "DEFAULT_FIELDS",
+    "DeploymentField",
+    "find",
+    "get",
+    "listdep",
+    "printdep",
+    "required_relations",
+]
 
 
 class DeploymentField(Enum):
@@ -43,13 +51,18 @@ FIELDS = {
         lambda dep: dep.connection.value, "Connection", size=8
     ),
     DeploymentField.ADDRESS: FieldFormatter(
-        lambda dep: str(dep.address), "Address", size=64, align_left=True
+        lambda dep: str(dep.address),
+        "Address",
+        size=64,
+        align_left=True,
+        relations={"address"},
     ),
     DeploymentField.LPT_ADDRESS: FieldFormatter(
         lambda dep: str(dep.lpt_address) if dep.lpt_address else None,
         "Public Transport Address",
         size=64,
         align_left=True,
+        relations={"lpt_address"},
     ),
     DeploymentField.SCHEDULED: FieldFormatter(
         lambda dep: dep.scheduled.isoformat() if dep.scheduled else None,
@@ -115,6 +128,12 @@ def listdep(
     return format_iter(deployments, FIELDS, fields)
 
 
+def required_relations(fields: Iterable[DeploymentField]) -> set[str]:
+    """Returns the relations needed to list the respective fields."""
+
+    return relations(FIELDS, fields)
+
+
 def printdep(deployment: Deployment):
     """Prints the respective system."""
 
@@ -8,12 +8,20 @@ from peewee import Select
 
 from mdb import Address
 
-from hwdb.tools.common import format_iter, FieldFormatter
+from hwdb.tools.common import format_iter, relations, FieldFormatter
 from hwdb.exceptions import AmbiguityError, TerminalError
 from hwdb.orm import Deployment, System
 
 
-__all__ = ["DEFAULT_FIELDS", "SystemField", "find", "get", "listsys", "printsys"]
+__all__ = [
+    "DEFAULT_FIELDS",
+    "SystemField",
+    "find",
+    "get",
+    "listsys",
+    "printsys",
+    "required_relations",
+]
 
 
 class SystemField(Enum):
@@ -49,16 +57,20 @@ FIELDS = {
     SystemField.DATASET: FieldFormatter(lambda sys: sys.dataset_id, "Dataset"),
     SystemField.DEPLOYMENT: FieldFormatter(lambda sys: sys.deployment_id, "Deployment"),
     SystemField.FITTED: FieldFormatter(lambda sys: sys.fitted, "Fitted"),
-    SystemField.GROUP: FieldFormatter(lambda sys: sys.group.id, "Group", size=12),
+    SystemField.GROUP: FieldFormatter(lambda sys: sys.group_id, "Group", size=12),
     SystemField.ID: FieldFormatter(lambda sys: sys.id, "ID", size=5),
-    SystemField.IP: FieldFormatter(lambda sys: sys.ip_address, "IP address", size=25),
+    SystemField.IP: FieldFormatter(
+        lambda sys: sys.ip_address, "IP address", size=25, relations={"openvpn"}
+    ),
     SystemField.MODEL: FieldFormatter(
         lambda sys: sys.model, "Model", size=24, align_left=True
     ),
     SystemField.MONITOR: FieldFormatter(lambda sys: sys.monitor, "Monitor"),
-    SystemField.ONLINE: FieldFormatter(lambda sys: sys.online, "Online"),
+    SystemField.ONLINE: FieldFormatter(
+        lambda sys: sys.online, "Online", relations={"openvpn"}
+    ),
     SystemField.OPENVPN: FieldFormatter(
-        lambda sys: sys.openvpn, "OpenVPN Address", size=14
+        lambda sys: sys.openvpn, "OpenVPN Address", size=14, relations={"openvpn"}
     ),
     SystemField.OS: FieldFormatter(
         lambda sys: sys.operating_system.value, "OS", size=25
@@ -123,6 +135,12 @@ def listsys(
     return format_iter(systems, FIELDS, fields)
 
 
+def required_relations(fields: Iterable[SystemField]) -> set[str]:
+    """Returns the relations needed to list the respective fields."""
+
+    return relations(FIELDS, fields)
+
+
 def printsys(system: System):
     """Prints the respective system."""
 
@@ -4,7 +4,14 @@ from ipaddress import IPv4Address, IPv6Address, IPv4Network, IPv6Network
 from typing import Iterable, NamedTuple, Optional, Union
 
 
-__all__ = ["DeploymentChange", "IPAddress", "IPNetwork", "IPAddresses", "IPSocket"]
+__all__ = [
+    "DeploymentChange",
+    "IPAddress",
+    "IPNetwork",
+    "IPAddresses",
+    "IPSocket",
+    "ProbeResult",
+]
 
 
 IPAddress = Union[IPv4Address, IPv6Address]
@@ -31,3 +38,12 @@ class IPSocket(NamedTuple):
             return f"[{self.ipaddress}]:{self.port}"
 
         return f"{self.ipaddress}:{self.port}"
+
+
+class ProbeResult(NamedTuple):
+    """Result of a system reachability probe."""
+
+    system: "System"
+    address: Optional[IPAddress]
+    online: bool
+    rtt: Optional[float] = None
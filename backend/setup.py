@@ -31,7 +31,13 @@ setup(
         "requests",
     ],
     entry_points={
-        "console_scripts": ["hwadm = hwdb.hwadm:main", "hwutil =  hwdb.hwutil:main"]
+        "console_scripts": [
+            "hwadm = hwdb.hwadm:main",
+            "hwdb-hooks = hwdb.hooks.runner:main",
+            "hwdb-inventory = hwdb.inventory:main",
+            "hwdb-sysinfo = hwdb.sysinfo:main",
+            "hwutil =  hwdb.hwutil:main",
+        ]
     },
     data_files=[
         (
@@ -41,7 +47,15 @@ setup(
                 "files/pacman.conf.temp",
                 "files/homeinfo.intranet.zone.temp",
             ],
-        )
+        ),
+        (
+            "/usr/lib/systemd/system",
+            [
+                "files/hwdb-hooks.service",
+                "files/hwdb-push-urls.service",
+                "files/hwdb-push-urls.timer",
+            ],
+        ),
     ],
     description="HOMEINFO's hardware libary.",
 )
@@ -0,0 +1,95 @@
+"""Shared fixtures of the test suite.
+
+The models are bound to a temporary SQLite database, which is shared by
+the connections of concurrent threads. Since SQLite does not support
+foreign keys across schemas, the schemas are dropped while the models
+are bound.
+"""
+
+from datetime import date, datetime, time
+from itertools import count
+from typing import Callable, Iterable
+
+import pytest
+
+
+DUMMIES = {
+    "BIGINT": 0,
+    "BOOL": False,
+    "DATE": date.today(),
+    "DATETIME": datetime.now(),
+    "DECIMAL": 0,
+    "DOUBLE": 0.0,
+    "FLOAT": 0.0,
+    "INT": 0,
+    "SMALLINT": 0,
+    "TIME": time(),
+}
+
+
+def related_models(models: Iterable[type]) -> list[type]:
+    """Returns the models and all models they refer to."""
+
+    pending, found = list(models), []
+
+    while pending:
+        if (model := pending.pop()) in found:
+            continue
+
+        found.append(model)
+        pending.extend(field.rel_model for field in model._meta.refs)
+
+    return found
+
+
+@pytest.fixture
+def database(monkeypatch, tmp_path):
+    """Binds the models to a temporary SQLite database."""
+
+    from peewee import SqliteDatabase
+
+    from hwdb.orm import MODELS
+
+    models = related_models(MODELS)
+    sqlite = SqliteDatabase(tmp_path / "hwdb.sqlite", pragmas={"foreign_keys": 1})
+
+    for model in models:
+        monkeypatch.setattr(model._meta, "schema", None)
+
+    with sqlite.bind_ctx(models):
+        sqlite.create_tables(models)
+        yield sqlite
+
+    sqlite.close()
+
+
+@pytest.fixture
+def create(database) -> Callable:  # pylint: disable=W0621,W0613
+    """Returns a function that creates a record of the given model.
+    Required fields that are not given are set to dummy values
+    and required foreign keys to newly created records.
+    """
+
+    from peewee import AutoField, ForeignKeyField
+
+    idents = count(1)
+
+    def create_record(model: type, **values):
+        for field in model._meta.sorted_fields:
+            if field.name in values or isinstance(field, AutoField):
+                continue
+
+            if field.primary_key:
+                values[field.name] = next(idents)
+            elif field.null or field.default is not None:
+                continue
+            elif isinstance(field, ForeignKeyField):
+                values[field.name] = create_record(field.rel_model)
+            elif (enum := getattr(field, "enum", None)) is not None:
+                values[field.name] = next(iter(enum))
+            else:
+                values[field.name] = DUMMIES.get(field.field_type, "dummy")
+
+        return model.create(**values)
+
+    return create_record
@@ -0,0 +1,146 @@
+"""Tests of the address allocation under concurrency."""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from ipaddress import ip_network
+from threading import Lock
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from peewee import IntegrityError
+
+from hwdb.exceptions import TerminalConfigError
+from hwdb.orm import OpenVPN
+from hwdb.orm import common, openvpn
+from hwdb.orm.common import allocating, is_collision
+
+
+ALLOCATIONS = 25  # Per worker.
+NETWORK = ip_network("10.8.0.0/24")
+WORKERS = 8
+COLLISION = IntegrityError(
+    1062, "Duplicate entry '167772171' for key 'openvpn.openvpn_ipv4address'"
+)
+OTHER_VIOLATION = IntegrityError(
+    1062, "Duplicate entry 'abc' for key 'system.system_pubkey'"
+)
+
+
+@pytest.fixture
+def unlocked(monkeypatch, database):
+    """Runs allocators in SQLite transactions without advisory locks."""
+
+    monkeypatch.setattr(common, "advisory_lock", lambda _: nullcontext())
+    monkeypatch.setattr(common, "DATABASE", database)
+
+
+@pytest.fixture
+def locked(monkeypatch, database):
+    """Runs allocators in SQLite transactions under a process-wide
+    lock standing in for the advisory locks of the database server.
+    """
+
+    lock = Lock()
+    monkeypatch.setattr(common, "advisory_lock", lambda _: lock)
+    monkeypatch.setattr(common, "DATABASE", database)
+    monkeypatch.setattr(openvpn, "get_openvpn_network", lambda: NETWORK)
+
+
+def test_is_collision():
+    """Only violations of the address keys are collisions."""
+
+    assert is_collision(COLLISION, {"ipv4address"})
+    assert is_collision(
+        IntegrityError(1062, "Duplicate entry '1' for key 'openvpn_ipv4address'"),
+        {"ipv4address"},
+    )
+    assert not is_collision(COLLISION, {"ipv6address"})
+    assert not is_collision(OTHER_VIOLATION, {"ipv4address"})
+    assert not is_collision(
+        IntegrityError(1452, "Cannot add or update a child row"), {"ipv4address"}
+    )
+    assert not is_collision(IntegrityError("UNIQUE constraint failed"), {"x"})
+
+
+def test_allocating_retries_collisions(unlocked):  # pylint: disable=W0613
+    """Address collisions are retried."""
+
+    errors = [COLLISION, COLLISION]
+
+    @allocating("test", {"ipv4address"})
+    def allocate():
+        if errors:
+            raise errors.pop()
+
+        return "allocated"
+
+    assert allocate() == "allocated"
+
+
+def test_allocating_gives_up(unlocked):  # pylint: disable=W0613
+    """Persistent collisions fail the allocation."""
+
+    @allocating("test", {"ipv4address"}, retries=3)
+    def allocate():
+        raise COLLISION
+
+    with pytest.raises(TerminalConfigError):
+        allocate()
+
+
+def test_allocating_raises_other_errors(unlocked):  # pylint: disable=W0613
+    """Other integrity errors are not mistaken for collisions."""
+
+    calls = []
+
+    @allocating("test", {"ipv4address"})
+    def allocate():
+        calls.append(None)
+        raise OTHER_VIOLATION
+
+    with pytest.raises(IntegrityError):
+        allocate()
+
+    assert len(calls) == 1
+
+
+def generate(amount: int) -> list[str]:
+    """Generates OpenVPN records in a worker thread."""
+
+    try:
+        return [str(OpenVPN.generate().ipv4address) for _ in range(amount)]
+    finally:
+        OpenVPN._meta.database.close()
+
+
+def test_allocating_refuses_transactions(unlocked, database):  # pylint: disable=W0613
+    """Allocations within an open transaction are refused,
+    since their commit would follow the release of the lock.
+    """
+
+    @allocating("test", {"ipv4address"})
+    def allocate():
+        return "allocated"
+
+    with database.atomic():
+        with pytest.raises(TerminalConfigError):
+            allocate()
+
+    assert allocate() == "allocated"
+
+
+def test_concurrent_generation(locked):  # pylint: disable=W0613
+    """Concurrent threads never allocate the same address."""
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        batches = list(executor.map(generate, [ALLOCATIONS] * WORKERS))
+
+    allocated = [address for batch in batches for address in batch]
+    assert len(allocated) == WORKERS * ALLOCATIONS
+    assert len(set(allocated)) == len(allocated)
+    assert OpenVPN.select().count() == len(allocated)
@@ -0,0 +1,62 @@
+"""Tests of the digest-based skipping of unchanged hook artefacts."""
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb.hooks.common import ArtefactWriter
+
+
+def write(path, *parts: tuple[str, bool], digest: str = None) -> tuple[bool, str]:
+    """Writes the hashed or unhashed parts to the artefact.
+    Returns whether it was replaced and its digest.
+    """
+
+    with ArtefactWriter(path) as artefact:
+        for text, hashed in parts:
+            artefact.write(text, hashed=hashed)
+
+        return artefact.commit(digest), artefact.digest
+
+
+def test_unchanged_artefact_is_not_replaced(tmp_path):
+    """An artefact with the digest of the previous run is not rewritten."""
+
+    path = tmp_path / "zone"
+    replaced, digest = write(path, ("records", True), ("1", False))
+    assert replaced
+    assert path.read_text(encoding="utf-8") == "records1"
+    inode = path.stat().st_ino
+
+    replaced, unchanged = write(path, ("records", True), ("2", False), digest=digest)
+    assert not replaced
+    assert unchanged == digest  # Unhashed parts do not affect the digest.
+    assert path.read_text(encoding="utf-8") == "records1"
+    assert path.stat().st_ino == inode
+    assert list(tmp_path.iterdir()) == [path]  # Temporary file removed.
+
+
+def test_changed_artefact_is_replaced(tmp_path):
+    """An artefact with a different digest is replaced atomically."""
+
+    path = tmp_path / "zone"
+    _, digest = write(path, ("old", True))
+    replaced, changed = write(path, ("new", True), digest=digest)
+    assert replaced
+    assert changed != digest
+    assert path.read_text(encoding="utf-8") == "new"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_missing_artefact_is_restored(tmp_path):
+    """An artefact deleted since the previous run is written again."""
+
+    path = tmp_path / "zone"
+    _, digest = write(path, ("records", True))
+    path.unlink()
+    replaced, _ = write(path, ("records", True), digest=digest)
+    assert replaced
+    assert path.read_text(encoding="utf-8") == "records"
@@ -0,0 +1,157 @@
+"""Tests of the bind9 hook's update modes with stand-ins for the DNS server."""
+
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb.hooks import bind9
+
+
+NSUPDATE = """#!/bin/sh
+cat >> "{log}"
+exit {returncode}
+"""
+TEMPLATE = """; {file}
+@ IN SOA ns.example. hostmaster.example. ({serial} 3600 900 604800 86400)
+{management}
+{terminals}
+"""
+
+
+def system(ident: int, ipv4address: str, ipv6address: str = None) -> object:
+    """Returns a stand-in for a system with an OpenVPN
+    and optionally a WireGuard address.
+    """
+
+    return SimpleNamespace(
+        id=ident,
+        hostname=f"{ident}.example",
+        openvpn=SimpleNamespace(ipv4address=ipv4address),
+        pubkey=None if ipv6address is None else "pubkey",
+        ipv6address=ipv6address,
+    )
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    """Replaces the zone, state, nsupdate and systemctl by local
+    stand-ins and returns a namespace to configure and inspect them.
+    """
+
+    config = ConfigParser()
+    config.read_dict({"bind9": {"zone": "example", "ttl": "300"}})
+    (template := tmp_path / "zone.temp").write_text(TEMPLATE, encoding="utf-8")
+    nsupdate = tmp_path / "nsupdate"
+    server = SimpleNamespace(
+        config=config,
+        zone=tmp_path / "zone",
+        updates=tmp_path / "nsupdate.log",
+        calls=[],
+    )
+
+    def fake_nsupdate(returncode: int = 0) -> None:
+        nsupdate.write_text(
+            NSUPDATE.format(log=server.updates, returncode=returncode),
+            encoding="utf-8",
+        )
+        nsupdate.chmod(0o755)
+
+    server.fake_nsupdate = fake_nsupdate
+    fake_nsupdate()
+    monkeypatch.setattr(bind9, "get_config", lambda: config)
+    monkeypatch.setattr(bind9, "get_state_file", lambda name: tmp_path / name)
+    monkeypatch.setattr(bind9, "DNS_CONFIG", server.zone)
+    monkeypatch.setattr(bind9, "DNS_TEMPLATE", template)
+    monkeypatch.setattr(bind9, "LOCAL_HOSTS_LIST", tmp_path / "local_hosts")
+    monkeypatch.setattr(bind9, "NSUPDATE", str(nsupdate))
+    monkeypatch.setattr(bind9, "systemctl", lambda *args: server.calls.append(args))
+    return server
+
+
+def run(server, mode: str, systems: list) -> bool:
+    """Runs the hook in the given mode without requiring root."""
+
+    server.config["bind9"]["mode"] = mode
+    return bind9.bind9cfgen.__wrapped__(systems)
+
+
+def updates(server) -> list[str]:
+    """Returns and clears the lines sent to nsupdate."""
+
+    try:
+        lines = server.updates.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+
+    server.updates.unlink()
+    return lines
+
+
+def test_nsupdate_sends_only_changes(server):
+    """Only added and removed records are sent as dynamic updates."""
+
+    first, second = system(1, "10.8.0.11"), system(2, "10.8.0.12", "fd00::2")
+
+    assert run(server, "nsupdate", [first, second])
+    assert updates(server) == [
+        "zone example.",
+        "update add 1.example.example. 300 A 10.8.0.11",
+        "update add 2.example.example. 300 A 10.8.0.12",
+        "update add 2.example.example. 300 AAAA fd00::2",
+        "send",
+    ]
+
+    assert run(server, "nsupdate", [first, second])
+    assert updates(server) == []  # Up to date, nsupdate is not invoked.
+
+    assert run(server, "nsupdate", [first, system(2, "10.8.0.13")])
+    assert updates(server) == [
+        "zone example.",
+        "update delete 2.example.example. A 10.8.0.12",
+        "update delete 2.example.example. AAAA fd00::2",
+        "update add 2.example.example. 300 A 10.8.0.13",
+        "send",
+    ]
+    assert not server.zone.exists()
+    assert not server.calls
+
+
+def test_nsupdate_failure_is_retried(server):
+    """Records rejected by nsupdate are sent again on the next run."""
+
+    server.fake_nsupdate(returncode=1)
+    assert not run(server, "nsupdate", [system(1, "10.8.0.11")])
+    assert "update add 1.example.example. 300 A 10.8.0.11" in updates(server)
+
+    server.fake_nsupdate()
+    assert run(server, "nsupdate", [system(1, "10.8.0.11")])
+    assert "update add 1.example.example. 300 A 10.8.0.11" in updates(server)
+
+
+@pytest.mark.parametrize("mode", ["reload", "restart"])
+def test_zone_is_replaced_on_change(server, mode):
+    """The zone is only rewritten with a new serial
+    and the server only reloaded or restarted if a record changed.
+    """
+
+    assert run(server, mode, [system(1, "10.8.0.11")])
+    assert server.calls == [(mode, bind9.BIND9_SERVICE)]
+    zone = server.zone.read_text(encoding="utf-8")
+    assert "1.example\tIN\tA\t10.8.0.11" in zone
+
+    assert run(server, mode, [system(1, "10.8.0.11")])
+    assert server.calls == [(mode, bind9.BIND9_SERVICE)]
+    assert server.zone.read_text(encoding="utf-8") == zone
+
+    assert run(server, mode, [system(1, "10.8.0.12")])
+    assert server.calls == [(mode, bind9.BIND9_SERVICE)] * 2
+    changed = server.zone.read_text(encoding="utf-8")
+    assert "1.example\tIN\tA\t10.8.0.12" in changed
+    assert changed.splitlines()[1] != zone.splitlines()[1]  # Serial bumped.
+    assert not updates(server)
@@ -0,0 +1,67 @@
+"""Benchmark of the full cascade against the pruned system selects."""
+
+from ipaddress import IPv4Address
+from os import environ
+from time import perf_counter
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb.orm import Deployment, Group, OpenVPN, System
+from hwdb.tools.system import DEFAULT_FIELDS, SystemField, required_relations
+
+
+ROUNDS = 5
+SYSTEMS = 2000
+
+
+def timed(select) -> tuple[float, list[int]]:
+    """Returns the best time of fetching the select and the system IDs."""
+
+    best, idents = float("inf"), []
+
+    for _ in range(ROUNDS):
+        start = perf_counter()
+        idents = [system.id for system in select.order_by(System.id)]
+        best = min(best, perf_counter() - start)
+
+    return best, idents
+
+
+def test_narrow_listing_is_single_table(database):
+    """Listing only columns of the system table joins nothing."""
+
+    relations = required_relations([SystemField.ID, SystemField.DEPLOYMENT])
+    sql, _ = System.select(cascade=True, relations=relations).sql()
+    assert "JOIN" not in sql
+
+
+@pytest.mark.skipif(
+    "HWDB_BENCHMARK" not in environ, reason="set HWDB_BENCHMARK to run benchmarks"
+)
+def test_benchmark_cascade(create):
+    """The pruned selects yield the same systems faster than the full cascade."""
+
+    group = create(Group)
+    deployments = [create(Deployment) for _ in range(10)]
+
+    for index in range(SYSTEMS):
+        create(
+            System,
+            group=group,
+            deployment=deployments[index % len(deployments)],
+            dataset=deployments[-index % len(deployments)],
+            openvpn=create(OpenVPN, ipv4address=IPv4Address(0x0A000000 + index)),
+        )
+
+    full, expected = timed(System.select(cascade=True))
+
+    for fields in (DEFAULT_FIELDS, [SystemField.ID, SystemField.DEPLOYMENT]):
+        relations = required_relations(fields)
+        pruned, idents = timed(System.select(cascade=True, relations=relations))
+        assert idents == expected
+        assert pruned < full
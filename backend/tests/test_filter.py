@@ -0,0 +1,95 @@
+"""Tests of the system and deployment filters."""
+
+from datetime import datetime, timedelta
+
+from peewee import JOIN
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb.filter import get_deployments, paginate, select_systems, stream_systems
+from hwdb.orm import Deployment, Reachability, System
+
+
+MAX_AGE = timedelta(minutes=10)
+
+
+def get_deployments_joined(systems: list[System]) -> list[Deployment]:
+    """Returns the deployments used by the systems
+    as selected before the semi-joins were introduced.
+    """
+
+    dataset = System.alias()
+    return list(
+        Deployment.select(cascade=True)
+        .join_from(
+            Deployment, dataset, JOIN.LEFT_OUTER, on=Deployment.id == dataset.dataset
+        )
+        .where((System.id << systems) | (dataset.id << systems))
+        .order_by(Deployment.id)
+    )
+
+
+def test_systems_filter_matches_join(create):
+    """The semi-joins select the same deployments as the former joins."""
+
+    deployments = [create(Deployment) for _ in range(6)]
+    systems = [
+        create(System, deployment=deployments[0]),
+        create(System, deployment=deployments[0]),  # Shared deployment.
+        create(System, dataset=deployments[1]),  # Dataset only.
+        create(System, deployment=deployments[2], dataset=deployments[2]),
+        create(System, deployment=deployments[3], dataset=deployments[4]),
+        create(System),  # Neither deployment nor dataset.
+    ]
+    create(System, deployment=deployments[5])  # Not selected.
+
+    for selected in (systems, systems[:1], systems[2:3], systems[4:], systems[5:]):
+        expected = get_deployments_joined(selected)
+        select = get_deployments(systems=selected, sort=True)
+        assert [deployment.id for deployment in select] == [
+            deployment.id for deployment in expected
+        ]
+        assert "DISTINCT" not in select.sql()[0]
+
+
+def test_online_filter_uses_recent_reachability(create):
+    """Systems not recently recorded as online count as offline."""
+
+    now = datetime.now()
+    online, offline, stale, unprobed = [create(System) for _ in range(4)]
+    create(Reachability, system=online, online=True, timestamp=now)
+    create(Reachability, system=offline, online=False, timestamp=now)
+    create(Reachability, system=stale, online=True, timestamp=now - 2 * MAX_AGE)
+
+    assert [system.id for system in select_systems(online=True, max_age=MAX_AGE)] == [
+        online.id
+    ]
+    assert sorted(
+        system.id for system in select_systems(online=False, max_age=MAX_AGE)
+    ) == sorted([offline.id, stale.id, unprobed.id])
+
+    with pytest.raises(ValueError):
+        select_systems(online=True)
+
+
+@pytest.mark.parametrize("page_size", [1, 3, 7, 10])
+def test_paginate_resumes_at_cursor(create, page_size):
+    """An interrupted iteration resumes after the cursor
+    without skipping or repeating records.
+    """
+
+    idents = [create(System).id for _ in range(7)]
+    pages = paginate(System.select(), System, page_size=page_size)
+    consumed = [next(pages).id for _ in range(4)]
+    pages.close()
+
+    assert consumed == idents[:4]
+    assert [
+        system.id for system in stream_systems(page_size=page_size, cursor=consumed[-1])
+    ] == idents[4:]
+    assert [system.id for system in stream_systems(page_size=page_size)] == idents
@@ -0,0 +1,119 @@
+"""Tests of the fallback to the ping binary if the
+kernel does not permit unprivileged ICMP sockets.
+"""
+
+from errno import EACCES
+from ipaddress import ip_address
+from socket import AF_INET
+from subprocess import CalledProcessError
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb import ctrl, icmp
+from hwdb.ctrl import BasicControllerMixin
+from hwdb.filter import probe
+from hwdb.icmp import Prober
+
+
+PING = "/usr/bin/ping"
+OFFLINE = ip_address("10.8.0.3")
+
+
+class Terminal(BasicControllerMixin):
+    """A stand-in for a system."""
+
+    def __init__(self, ident: int, address: str):
+        self.id = ident
+        self.ip_address = ip_address(address)
+
+
+class FakeSocket:
+    """A socket that records whether it was closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    def setsockopt(self, *_) -> None:
+        """Accepts any option."""
+
+    def bind(self, *_) -> None:
+        """Accepts any address."""
+
+    def setblocking(self, *_) -> None:
+        """Accepts any mode."""
+
+    def close(self) -> None:
+        """Marks the socket as closed."""
+        self.closed = True
+
+
+@pytest.fixture
+def refused(monkeypatch):
+    """Refuses ICMP sockets of all but the permitted address families
+    and replaces the ping binary. Returns a namespace of the permitted
+    families, the opened sockets and the pinged commands.
+    """
+
+    state = SimpleNamespace(permitted=set(), sockets=[], commands=[])
+
+    def socket(family, *_):
+        if family not in state.permitted:
+            raise PermissionError(EACCES, "Permission denied")
+
+        state.sockets.append(sock := FakeSocket())
+        return sock
+
+    def check_call(command, **_) -> int:
+        state.commands.append(command)
+
+        if command[-1] == str(OFFLINE):
+            raise CalledProcessError(1, command)
+
+        return 0
+
+    monkeypatch.setattr(icmp, "socket", socket)
+    monkeypatch.setattr(ctrl, "check_call", check_call)
+    monkeypatch.setattr(ctrl, "get_ping", lambda: PING)
+    monkeypatch.setattr(ctrl, "get_ping_native", lambda: True)
+    return state
+
+
+def test_prober_raises_eagerly(refused):
+    """The prober raises when probing and closes the sockets it opened."""
+
+    refused.permitted.add(AF_INET)
+
+    with pytest.raises(PermissionError):
+        Prober().probe([ip_address("10.8.0.1"), ip_address("fd00::1")])
+
+    assert refused.sockets and all(sock.closed for sock in refused.sockets)
+
+
+def test_ping_falls_back_to_binary(refused):
+    """Pinging a system natively runs the ping binary instead."""
+
+    assert Terminal(1, "fd00::1").ping(count=2, native=True) == 0
+    assert refused.commands == [[PING, "-qc", "2", "fd00::1"]]
+
+
+def test_probe_falls_back_to_binary(refused):
+    """Probing systems natively runs the ping binary for each instead."""
+
+    systems = [Terminal(1, "fd00::1"), Terminal(2, "fd00::2"), Terminal(3, "10.8.0.3")]
+    results = probe(systems, native=True, cache=False, ordered=True)
+    assert [(result.system.id, result.online) for result in results] == [
+        (1, True),
+        (2, True),
+        (3, False),
+    ]
+    assert sorted(command[-1] for command in refused.commands) == [
+        "10.8.0.3",
+        "fd00::1",
+        "fd00::2",
+    ]
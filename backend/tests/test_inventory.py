@@ -0,0 +1,119 @@
+"""Tests of the rollout blocks and the cached ansible inventory."""
+
+from configparser import ConfigParser
+from itertools import chain
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb import inventory
+from hwdb.ansible import RolloutHost, rollout_blocks
+
+
+def hosts(amount: int, *, customers: int = 1, paths: int = 1) -> list[RolloutHost]:
+    """Returns hosts of unit weight spread over customers and paths."""
+
+    return [
+        RolloutHost(index, index % customers, f"vpn{index % paths}", 1.0)
+        for index in range(amount)
+    ]
+
+
+def test_blocks_respect_size():
+    """Every host is assigned once to the least amount of blocks."""
+
+    blocks = rollout_blocks(hosts(23), block_size=5)
+    assert len(blocks) == 5
+    assert all(len(block) <= 5 for block in blocks)
+    assert sorted(chain.from_iterable(blocks)) == list(range(23))
+
+
+def test_blocks_respect_path_limit():
+    """No block reaches more hosts through one VPN path than the limit."""
+
+    rollout = hosts(12, paths=2)
+    blocks = rollout_blocks(rollout, block_size=10, path_limit=2)
+    paths = {host.host: host.path for host in rollout}
+    assert len(blocks) == 3
+    assert all(
+        [paths[host] for host in block].count(path) <= 2
+        for block in blocks
+        for path in ("vpn0", "vpn1")
+    )
+    assert sorted(chain.from_iterable(blocks)) == list(range(12))
+
+
+def test_blocks_spread_customers_and_weight():
+    """Hosts of a customer and heavy hosts are spread over the blocks."""
+
+    rollout = [
+        RolloutHost("heavy1", 1, "vpn", 10.0),
+        RolloutHost("heavy2", 1, "vpn", 10.0),
+        RolloutHost("light1", 2, "vpn", 1.0),
+        RolloutHost("light2", 2, "vpn", 1.0),
+    ]
+    blocks = rollout_blocks(rollout, block_size=2)
+    assert sorted(map(sorted, blocks)) == [["heavy1", "light1"], ["heavy2", "light2"]]
+
+
+@pytest.fixture
+def cached(monkeypatch, tmp_path):
+    """Replaces the inventory's data sources by counters and
+    returns a namespace to control and inspect them.
+    """
+
+    config = ConfigParser()
+    config.read_dict(
+        {"ansible": {"cache_file": str(tmp_path / "inventory.json"), "cache_ttl": "60"}}
+    )
+    state = SimpleNamespace(path=tmp_path / "inventory.json", journal=1, builds=0)
+    clock = SimpleNamespace(now=1000.0)
+
+    def ansible_inventory(**_) -> dict:
+        state.builds += 1
+        return {"build": state.builds}
+
+    monkeypatch.setattr(inventory, "get_config", lambda: config)
+    monkeypatch.setattr(inventory, "get_journal_position", lambda: state.journal)
+    monkeypatch.setattr(inventory, "time", lambda: clock.now)
+    monkeypatch.setattr(
+        inventory, "System", SimpleNamespace(ansible_inventory=ansible_inventory)
+    )
+    monkeypatch.setattr(
+        inventory, "Reachability", SimpleNamespace(by_system=lambda _: {})
+    )
+    state.clock = clock
+    return state
+
+
+def test_inventory_is_cached_until_journal_changes(cached):
+    """The cached inventory is used until a change is journaled."""
+
+    assert inventory.get_inventory() == {"build": 1}
+    assert inventory.get_inventory() == {"build": 1}
+    cached.journal = 2
+    assert inventory.get_inventory() == {"build": 2}
+    assert inventory.get_inventory() == {"build": 2}
+
+
+def test_inventory_cache_expires(cached):
+    """The cached inventory expires after its TTL or on refresh."""
+
+    assert inventory.get_inventory() == {"build": 1}
+    cached.clock.now += 61
+    assert inventory.get_inventory() == {"build": 2}
+    assert inventory.get_inventory(refresh=True) == {"build": 3}
+
+
+@pytest.mark.parametrize("content", ["{", "[]", '{"journal": 1}'])
+def test_corrupt_inventory_cache_is_a_miss(cached, content):
+    """Unreadable or incomplete cache files are rebuilt."""
+
+    cached.path.write_text(content, encoding="utf-8")
+    assert inventory.get_inventory() == {"build": 1}
+    assert inventory.get_inventory() == {"build": 1}
@@ -0,0 +1,94 @@
+"""Tests of the keep-alive session pool."""
+
+from ipaddress import IPv4Address
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb import sessions
+from hwdb.sessions import SessionPool
+from hwdb.types import IPSocket
+
+
+class FakeSession:
+    """A session that records whether it was closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self) -> None:
+        """Marks the session as closed."""
+        self.closed = True
+
+
+def socket(index: int) -> IPSocket:
+    """Returns the socket of a system."""
+
+    return IPSocket(IPv4Address(0x0A080000 + index), 5000)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the pool's clock and session factory."""
+
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(sessions, "monotonic", lambda: clock.now)
+    monkeypatch.setattr(SessionPool, "_new_session", lambda _: FakeSession())
+    return clock
+
+
+def test_sessions_are_reused(clock):  # pylint: disable=W0613
+    """Each socket keeps its session while in use."""
+
+    pool = SessionPool()
+    first = pool.get(socket(1))
+    assert pool.get(socket(1)) is first
+    assert pool.get(socket(2)) is not first
+    assert len(pool) == 2
+
+
+def test_least_recently_used_session_is_closed(clock):
+    """A full pool closes the least recently used session."""
+
+    pool = SessionPool(max_sessions=2)
+    first = pool.get(socket(1))
+    clock.now += 1
+    second = pool.get(socket(2))
+    clock.now += 1
+    assert pool.get(socket(1)) is first  # Now more recently used than second.
+    third = pool.get(socket(3))
+    assert second.closed
+    assert not first.closed and not third.closed
+    assert len(pool) == 2
+    assert pool.get(socket(2)) is not second
+
+
+def test_idle_sessions_are_closed(clock):
+    """Sessions unused within the idle timeout are closed
+    once a new session is opened.
+    """
+
+    pool = SessionPool(idle_timeout=60)
+    idle = pool.get(socket(1))
+    clock.now += 30
+    active = pool.get(socket(2))
+    clock.now += 31
+    pool.get(socket(3))
+    assert idle.closed
+    assert not active.closed
+    assert len(pool) == 2
+
+
+def test_close_closes_all_sessions(clock):  # pylint: disable=W0613
+    """Closing the pool closes all of its sessions."""
+
+    with SessionPool() as pool:
+        opened = [pool.get(socket(index)) for index in range(3)]
+
+    assert all(session.closed for session in opened)
+    assert not pool
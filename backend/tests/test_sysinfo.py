@@ -0,0 +1,98 @@
+"""Tests of the downsampling of the sysinfo store."""
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb.sysinfo import SysinfoStore
+
+
+BASE = 1000 * 3600  # Start of a bucket.
+BUCKET = 3600
+DOWNSAMPLE_AFTER = 86400
+
+
+@pytest.fixture
+def store():
+    """Returns an in-memory store with hourly buckets."""
+
+    return SysinfoStore(
+        retention=10 * 86400, downsample_after=DOWNSAMPLE_AFTER, bucket=BUCKET
+    )
+
+
+def record(store, system: int, *samples: tuple[int, float]) -> None:
+    """Stores the load of the system at the given offsets from BASE."""
+
+    for offset, load in samples:
+        store.store(system, {"cpu": {"load": load}}, timestamp=BASE + offset)
+
+
+def counts(store, system: int = 1) -> list[tuple[int, int]]:
+    """Returns the offsets and sample counts of the system's buckets."""
+
+    return [
+        (timestamp - BASE, count)
+        for timestamp, count in store.connection.execute(
+            "SELECT timestamp, count FROM downsampled "
+            "WHERE system = ? ORDER BY timestamp",
+            (system,),
+        )
+    ]
+
+
+def test_old_samples_are_averaged_into_buckets(store):
+    """Samples older than downsample_after are replaced by their
+    bucket's average, while recent samples are kept as they are.
+    """
+
+    now = BASE + 2 * BUCKET + DOWNSAMPLE_AFTER
+    record(store, 1, (0, 1.0), (1800, 3.0), (3600, 5.0))
+    record(store, 1, (now - BASE - 60, 7.0), (now - BASE - 30, 9.0))
+    record(store, 2, (0, 10.0))
+    store.compact(now=now)
+
+    assert store.series(1, "cpu.load") == [
+        (BASE, 2.0),
+        (BASE + BUCKET, 5.0),
+        (now - 60, 7.0),
+        (now - 30, 9.0),
+    ]
+    assert store.series(2, "cpu.load") == [(BASE, 10.0)]
+    assert store.series(1, "cpu.load", since=now - 30) == [(now - 30, 9.0)]
+    assert counts(store) == [(0, 2), (BUCKET, 1)]
+
+
+def test_only_complete_buckets_are_downsampled(store):
+    """Incomplete buckets are kept raw until they are complete,
+    so that repeated compaction aggregates each bucket exactly once.
+    """
+
+    now = BASE + DOWNSAMPLE_AFTER + BUCKET + 1800
+    record(store, 1, (0, 1.0), (BUCKET, 2.0), (BUCKET + 1800, 4.0))
+    store.compact(now=now)
+    assert store.series(1, "cpu.load") == [
+        (BASE, 1.0),
+        (BASE + BUCKET, 2.0),
+        (BASE + BUCKET + 1800, 4.0),
+    ]
+    assert counts(store) == [(0, 1)]
+
+    store.compact(now=now)
+    store.compact(now=now + BUCKET)
+    assert store.series(1, "cpu.load") == [(BASE, 1.0), (BASE + BUCKET, 3.0)]
+    assert counts(store) == [(0, 1), (BUCKET, 2)]
+
+
+def test_expired_buckets_are_removed(store):
+    """Downsampled buckets are removed once they exceed the retention."""
+
+    record(store, 1, (0, 1.0), (BUCKET, 2.0))
+    store.compact(now=BASE + store.retention)
+    assert counts(store) == [(0, 1), (BUCKET, 1)]
+
+    store.compact(now=BASE + store.retention + BUCKET)
+    assert store.series(1, "cpu.load") == [(BASE + BUCKET, 2.0)]
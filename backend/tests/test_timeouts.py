@@ -0,0 +1,85 @@
+"""Tests of the adaptive timeouts."""
+
+import pytest
+
+pytest.importorskip("configlib")
+pytest.importorskip("mdb")
+pytest.importorskip("peeweeplus")
+
+# pylint: disable=C0413
+from hwdb.timeouts import DefaultTimeout, LatencyTracker
+
+
+FALLBACK = 10.0
+
+
+@pytest.fixture
+def tracker():
+    """Returns a tracker with a small window."""
+
+    return LatencyTracker(window=10, factor=3, floor=2, ceiling=30, min_samples=5)
+
+
+def record(tracker, system: int, connection: str, *latencies: float) -> None:
+    """Records the latencies of the system."""
+
+    for latency in latencies:
+        tracker.record(system, connection, latency)
+
+
+def test_timeout_is_scaled_percentile(tracker):
+    """The timeout is the high percentile of the latencies times the factor."""
+
+    record(tracker, 1, "dsl", 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3, 2.0)
+    assert tracker.timeout(1, "dsl", FALLBACK) == pytest.approx(6.0)
+    assert tracker.resolve(1, "dsl", DefaultTimeout(FALLBACK)) == pytest.approx(6.0)
+    assert tracker.resolve(1, "dsl", 42) == 42
+    assert tracker.resolve(1, "dsl", None) is None
+
+
+@pytest.mark.parametrize("latency, timeout", [(0.1, 2.0), (20.0, 30.0)])
+def test_timeout_is_clamped(tracker, latency, timeout):
+    """The timeout is clamped between floor and ceiling."""
+
+    record(tracker, 1, "dsl", *[latency] * 5)
+    assert tracker.timeout(1, "dsl", FALLBACK) == timeout
+
+
+def test_connection_window_is_used_until_min_samples(tracker):
+    """Systems with few latencies use those of their connection type
+    and the fallback if the connection type has too few as well.
+    """
+
+    assert tracker.timeout(1, "lte", FALLBACK) == FALLBACK
+    record(tracker, 2, "lte", 3.0, 3.0)
+    record(tracker, 3, "lte", 3.0, 3.0)
+    assert tracker.timeout(1, "lte", FALLBACK) == FALLBACK
+    record(tracker, 4, "lte", 3.0)
+    assert tracker.timeout(1, "lte", FALLBACK) == 9.0
+
+    record(tracker, 1, "lte", *[1.0] * 4)
+    assert tracker.timeout(1, "lte", FALLBACK) == 9.0  # Mixed connection window.
+    record(tracker, 1, "lte", 1.0)
+    assert tracker.timeout(1, "lte", FALLBACK) == 3.0  # Own window.
+
+
+def test_censored_percentile_uses_fallback(tracker):
+    """If the percentile is a timed out request, the fallback is used."""
+
+    record(tracker, 1, "dsl", *[1.0] * 9)
+    tracker.record_timeout(1)
+    assert tracker.timeout(1, "dsl", FALLBACK) == FALLBACK
+
+    record(tracker, 1, "dsl", *[1.0] * 10)  # Timeout leaves the window.
+    assert tracker.timeout(1, "dsl", FALLBACK) == 3.0
+
+
+def test_timeouts_only_affect_own_window(tracker):
+    """Timeouts of a system do not change its connection type's timeout."""
+
+    record(tracker, 1, "dsl", *[1.0] * 5)
+    for _ in range(10):
+        tracker.record_timeout(1)
+
+    assert tracker.timeout(1, "dsl", FALLBACK) == FALLBACK
+    assert tracker.timeout(2, "dsl", FALLBACK) == 3.0